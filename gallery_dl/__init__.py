@@ -18,7 +18,7 @@ import os
 import sys
 import argparse
 import json
-from . import config, extractor, job, exception
+from . import config, extractor, job, workqueue, cache, exception
 
 def build_cmdline_parser():
     parser = argparse.ArgumentParser(
@@ -40,6 +40,13 @@ def build_cmdline_parser():
         "-p", "--password",
         metavar="PASS"
     )
+    parser.add_argument(
+        "-i", "--input-file",
+        metavar="FILE", dest="inputfile",
+        help="download URLs found in local FILE ('-' for stdin); "
+             "progress is kept in a persistent queue and resumed if "
+             "the previous run got interrupted",
+    )
     parser.add_argument(
         "-c", "--config",
         metavar="CFG", dest="cfgfiles", action="append",
@@ -50,6 +57,10 @@ def build_cmdline_parser():
         metavar="OPT", action="append", default=[],
         help="additional 'key=value' option values",
     )
+    parser.add_argument(
+        "--asyncio", dest="asyncio", action="store_true",
+        help="download all URLs concurrently on a single event loop",
+    )
     parser.add_argument(
         "--list-extractors", dest="list_extractors", action="store_true",
         help="print a list of extractor classes with description and example URL",
@@ -62,6 +73,14 @@ def build_cmdline_parser():
         "--list-modules", dest="list_modules", action="store_true",
         help="print a list of available modules/supported sites",
     )
+    parser.add_argument(
+        "--cache-stats", dest="cache_stats", action="store_true",
+        help="print entries, size and hit rate of each cached function",
+    )
+    parser.add_argument(
+        "--cache-purge", dest="cache_purge", action="store_true",
+        help="delete expired entries from the cache database",
+    )
     parser.add_argument(
         "--version", action="version", version=__version__,
         help="print program version and exit"
@@ -85,6 +104,62 @@ def parse_option(opt):
     except ValueError:
         print("Invalid 'key=value' pair:", opt, file=sys.stderr)
 
+def read_input(path):
+    """Return a list of all URLs in 'path' (one per line; '-' is stdin)"""
+    if path == "-":
+        lines = sys.stdin.readlines()
+    else:
+        with open(os.path.expanduser(path)) as file:
+            lines = file.readlines()
+    return [
+        line.strip() for line in lines
+        if line.strip() and not line.startswith("#")
+    ]
+
+def report_error(url, exc):
+    """Print an error message for a failed job or re-raise 'exc'"""
+    if isinstance(exc, exception.NoExtractorError):
+        print("No suitable extractor found for URL '", url, "'",
+              sep="", file=sys.stderr)
+    elif isinstance(exc, exception.AuthenticationError):
+        print("Authentication failed. Please provide a valid "
+              "username/password pair.", file=sys.stderr)
+    elif isinstance(exc, exception.NotFoundError):
+        res = str(exc) or "resource (gallery/image/user)"
+        print("The ", res, " at '", url, "' does not exist",
+              sep="", file=sys.stderr)
+    else:
+        raise exc
+
+def run_jobs(jobtype, urls, queue=None):
+    """Run a 'jobtype' job for each URL in 'urls'
+
+    With a WorkQueue, the outcome of each URL is recorded, a failed URL
+    does not stop the remaining ones, and all entries are removed once
+    every URL has been processed.
+    """
+    for url in urls:
+        try:
+            jobtype(url).run()
+        except (exception.NoExtractorError,
+                exception.AuthenticationError,
+                exception.NotFoundError) as exc:
+            report_error(url, exc)
+            if queue:
+                queue.failed(url, exc.__class__.__name__)
+        except Exception as exc:
+            if not queue:
+                raise
+            print("Error while processing '", url, "': ",
+                  exc.__class__.__name__, ": ", exc,
+                  sep="", file=sys.stderr)
+            queue.failed(url, "{}: {}".format(exc.__class__.__name__, exc))
+        else:
+            if queue:
+                queue.done(url)
+    if queue:
+        queue.clear()
+
 def main():
     try:
         config.load()
@@ -107,38 +182,55 @@ def main():
         if args.list_modules:
             for module_name in extractor.modules:
                 print(module_name)
+        elif args.cache_stats:
+            fmt = "{:<48} {:>7} {:>9} {:>7} {:>7} {:>8}"
+            print(fmt.format(
+                "Function", "Entries", "Size", "Hits", "Misses", "Hit rate"))
+            for key, entries, size, hits, misses in cache.DBCACHE.stats():
+                total = hits + misses
+                rate = "{:.1%}".format(hits / total) if total else "-"
+                print(fmt.format(key, entries, size, hits, misses, rate))
+        elif args.cache_purge:
+            removed = cache.DBCACHE.purge()
+            cache.DBCACHE.vacuum()
+            print("Removed", removed, "expired cache entries")
         elif args.list_extractors:
-            for extr in extractor.extractors():
-                print(extr.__name__)
-                if extr.__doc__:
-                    print(extr.__doc__)
-                if hasattr(extr, "test") and extr.test:
-                    print("Example:", extr.test[0][0])
+            for info in sorted(extractor.manifest(),
+                               key=lambda x: x["class"]):
+                print(info["class"])
+                if info["doc"]:
+                    print(info["doc"])
+                if info["example"]:
+                    print("Example:", info["example"])
                 print()
         else:
-            if not args.urls:
+            urls = args.urls
+            if args.inputfile:
+                urls = urls + read_input(args.inputfile)
+            if not urls:
                 parser.error("the following arguments are required: URL")
 
             if args.list_urls:
                 jobtype = job.UrlJob
             elif args.list_keywords:
                 jobtype = job.KeywordJob
+            elif args.asyncio:
+                if args.inputfile:
+                    print("Warning: '--asyncio' does not keep track of the "
+                          "progress of '--input-file' URLs; an interrupted "
+                          "run starts from the beginning", file=sys.stderr)
+                from . import asyncjob
+                asyncjob.AsyncDownloadJob(urls, report_error).run()
+                return
             else:
                 jobtype = job.DownloadJob
 
-            for url in args.urls:
-                try:
-                    jobtype(url).run()
-                except exception.NoExtractorError:
-                    print("No suitable extractor found for URL '", url, "'",
-                          sep="", file=sys.stderr)
-                except exception.AuthenticationError:
-                    print("Authentication failed. Please provide a valid "
-                          "username/password pair.", file=sys.stderr)
-                except exception.NotFoundError as err:
-                    res = str(err) or "resource (gallery/image/user)"
-                    print("The ", res, " at '", url, "' does not exist",
-                          sep="", file=sys.stderr)
+            queue = None
+            if args.inputfile and jobtype is job.DownloadJob:
+                queue = workqueue.WorkQueue(source=args.inputfile)
+                queue.load(urls)
+                urls = queue
+            run_jobs(jobtype, urls, queue)
 
     except KeyboardInterrupt:
         print("\nKeyboardInterrupt", file=sys.stderr)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Record of already downloaded items"""
+
+from . import database
+
+
+class DownloadArchive():
+    """Set of downloaded items of one category stored in an SQLite database
+
+    Items are identified by a key made from their category and the result
+    of formatting 'fmt' with their metadata, e.g. 'danbooru' + '{id}'.
+    """
+
+    def __init__(self, path, category, fmt):
+        self.db, self.lock = database.connect(
+            path,
+            "CREATE TABLE IF NOT EXISTS archive "
+            "(entry TEXT PRIMARY KEY) WITHOUT ROWID",
+        )
+        self.category = category
+        self.fmt = fmt
+
+    def __contains__(self, key):
+        with self.lock:
+            cursor = self.db.execute(
+                "SELECT 1 FROM archive WHERE entry=? LIMIT 1", (key,))
+            return cursor.fetchone() is not None
+
+    def add(self, key):
+        """Add 'key' to the archive"""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR IGNORE INTO archive VALUES (?)", (key,))
+
+    def key(self, kwdict):
+        """Return the archive key for 'kwdict'"""
+        return self.category + self.fmt.format(**kwdict)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Download the resources of many URLs on a single asyncio event loop
+
+This module requires Python 3.5+ and is only imported when selected.
+"""
+
+import asyncio
+import concurrent.futures
+from . import config, job, output
+from .extractor.message import Message
+
+
+class AsyncDownloadJob():
+    """Run DownloadJobs for a list of URLs concurrently
+
+    Extractors and downloaders are blocking, so each of their steps is
+    handed to a bounded thread pool while the event loop keeps track of
+    all active jobs. The number of threads therefore depends on the
+    'async.workers' and 'async.jobs' options, not on the number of URLs.
+    """
+
+    def __init__(self, urls, report=None):
+        self.urls = urls
+        self.report = report
+        self.jobs = config.get(("async", "jobs"), 8)
+        self.workers = config.get(("async", "workers"), 16)
+        self.printer = output.select(concurrent=True)
+        self.loop = None
+        self.slots = None
+        self.tasks = set()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+        self.loop.set_default_executor(executor)
+        try:
+            self.loop.run_until_complete(self.run_all())
+        finally:
+            executor.shutdown(wait=False)
+            self.loop.close()
+
+    async def run_all(self):
+        """Process all URLs, including URLs queued by extractors"""
+        self.slots = asyncio.Semaphore(self.jobs)
+        for url in self.urls:
+            self.spawn(url, url)
+        while self.tasks:
+            done, _ = await asyncio.wait(
+                self.tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            self.tasks -= done
+            for task in done:
+                task.result()
+
+    def spawn(self, url, extr):
+        """Schedule the processing of 'url' with extractor 'extr'
+
+        'extr' can also be the URL itself to let DownloadJob look for
+        a suitable extractor.
+        """
+        self.tasks.add(self.loop.create_task(self.process(url, extr)))
+
+    async def process(self, url, extr):
+        """Run a single DownloadJob and report its errors"""
+        try:
+            async with self.slots:
+                queue = await self.run_job(extr)
+        except Exception as exc:
+            if not self.report:
+                raise
+            self.report(url, exc)
+            return
+        for child, extr in job.children(queue or ()):
+            self.spawn(child, extr)
+
+    async def run_job(self, extr):
+        """Drive the extractor of a DownloadJob and await its downloads"""
+        call = self.call
+        djob = await call(job.DownloadJob, extr)
+        djob.printer = self.printer
+        djob.pool = pool = LoopPool(self, djob)
+        messages = iter(djob.extractor)
+        while True:
+            msg = await call(next, messages, None)
+            if msg is None:
+                break
+            if msg[0] == Message.Url:
+                await call(djob.download, msg)
+            else:
+                djob.dispatch(msg)
+        await pool.join()
+        return djob.queue
+
+    def call(self, func, *args):
+        """Run a blocking function in the thread pool"""
+        return self.loop.run_in_executor(None, func, *args)
+
+
+class LoopPool():
+    """Download pool for DownloadJobs that schedules files on an event loop"""
+
+    def __init__(self, engine, djob):
+        self.engine = engine
+        self.job = djob
+        self.futures = []
+
+    def put(self, *task):
+        # called from a worker thread of the loop's executor
+        self.engine.loop.call_soon_threadsafe(self.schedule, task)
+
+    def schedule(self, task):
+        self.futures.append(self.engine.call(self.job.download_file, *task))
+
+    async def join(self):
+        # let pending 'call_soon_threadsafe' callbacks run first
+        await asyncio.sleep(0)
+        if self.futures:
+            await asyncio.gather(*self.futures)
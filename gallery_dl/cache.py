@@ -13,7 +13,11 @@ import pickle
 import time
 import tempfile
 import os
+import sys
+import atexit
 import functools
+import threading
+import collections
 from . import config
 
 
@@ -65,70 +69,212 @@ class CacheChain(CacheModule):
         for module in self.modules:
             module.__setitem__(key, item)
 
+    def __enter__(self):
+        for module in self.modules:
+            module.__enter__()
+
     def __exit__(self, exc_type, exc_value, exc_traceback):
         for module in self.modules:
             module.__exit__(exc_type, exc_value, exc_traceback)
 
 
 class MemoryCache(CacheModule):
-    """In-memory cache module"""
+    """In-memory cache module
+
+    Holds at most 'cache.memory-entries' entries with an estimated total
+    size of 'cache.memory-size' bytes and drops the least recently used
+    ones first.
+    """
     def __init__(self):
         CacheModule.__init__(self)
-        self.cache = {}
+        self.cache = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
 
     def __getitem__(self, key):
         key, timestamp = key
-        try:
-            value, expires = self.cache[key]
-            if timestamp < expires:
-                return value, expires
-        except KeyError:
-            pass
+        with self.lock:
+            try:
+                value, expires, _ = self.cache[key]
+                if timestamp < expires:
+                    self.cache.move_to_end(key)
+                    return value, expires
+            except KeyError:
+                pass
         raise CacheInvalidError()
 
     def __setitem__(self, key, item):
-        self.cache[key] = item
+        value, expires = item
+        try:
+            size = len(pickle.dumps(value))
+        except Exception:
+            size = sys.getsizeof(value)
+        max_entries = config.get(("cache", "memory-entries"), 1000)
+        max_size = config.get(("cache", "memory-size"), 32*1024*1024)
+        with self.lock:
+            if key in self.cache:
+                self.size -= self.cache.pop(key)[2]
+            self.cache[key] = (value, expires, size)
+            self.size += size
+            while self.cache and (len(self.cache) > max_entries or
+                                  self.size > max_size):
+                self.size -= self.cache.popitem(last=False)[1][2]
 
 
 class DatabaseCache(CacheModule):
-    """Database cache module"""
+    """Database cache module
+
+    The database file is only opened on the first cache lookup, and
+    setting 'cache.file' to null disables this module.
+
+    Lookups are plain SELECT statements, which in WAL mode (the default
+    for 'cache.journal-mode') neither block nor get blocked by other
+    processes. New entries are collected until the outermost 'with'
+    block ends and then written in one short transaction.
+    """
     def __init__(self):
         CacheModule.__init__(self)
-        path_default = os.path.join(tempfile.gettempdir(), ".gallery-dl.cache")
-        path = config.get(("cache", "file"), path_default)
-        if path is None:
-            raise RuntimeError()
-        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
-        self.db.execute("CREATE TABLE IF NOT EXISTS data ("
-                            "key TEXT PRIMARY KEY,"
-                            "value TEXT,"
-                            "expires INTEGER"
-                        ")")
+        self.db = None
+        self.lock = threading.RLock()
+        self.pending = {}
+        self.depth = 0
+
+    def connect(self):
+        """Return the database connection or None if disabled"""
+        if self.db is None:
+            with self.lock:
+                if self.db is None:
+                    path_default = os.path.join(
+                        tempfile.gettempdir(), ".gallery-dl.cache")
+                    path = config.get(("cache", "file"), path_default)
+                    if path is None:
+                        return None
+                    db = sqlite3.connect(
+                        path, timeout=30, isolation_level=None,
+                        check_same_thread=False)
+                    mode = config.get(("cache", "journal-mode"), "wal")
+                    if mode:
+                        db.execute("PRAGMA journal_mode=" + mode)
+                        if mode.lower() == "wal":
+                            # a lost cache entry after a power failure is
+                            # not worth an fsync for every write
+                            db.execute("PRAGMA synchronous=NORMAL")
+                    db.execute("CREATE TABLE IF NOT EXISTS data ("
+                                   "key TEXT PRIMARY KEY,"
+                                   "value TEXT,"
+                                   "expires INTEGER"
+                               ")")
+                    db.execute("CREATE TABLE IF NOT EXISTS stats ("
+                                   "key TEXT PRIMARY KEY,"
+                                   "hits INTEGER,"
+                                   "misses INTEGER"
+                               ")")
+                    self.db = db
+        return self.db
 
     def __getitem__(self, key):
         key, timestamp = key
-        try:
-            cursor = self.db.cursor()
-            cursor.execute("BEGIN EXCLUSIVE")
-            cursor.execute("SELECT value, expires FROM data WHERE key=?", (key,))
-            value, expires = cursor.fetchone()
-            if timestamp < expires:
-                self.commit()
-                return pickle.loads(value), expires
-        except TypeError:
-            pass
+        with self.lock:
+            try:
+                value, expires = self.pending[key]
+                if timestamp < expires:
+                    return value, expires
+            except KeyError:
+                pass
+            if not self.connect():
+                raise CacheInvalidError()
+            row = self.db.execute(
+                "SELECT value, expires FROM data WHERE key=?", (key,)
+            ).fetchone()
+        if row and timestamp < row[1]:
+            return pickle.loads(row[0]), row[1]
         raise CacheInvalidError()
 
     def __setitem__(self, key, item):
-        value, expires = item
-        self.db.execute("INSERT OR REPLACE INTO data VALUES (?,?,?)",
-                        (key, pickle.dumps(value), expires))
+        with self.lock:
+            self.pending[key] = item
+            if not self.depth:
+                self.commit()
+
+    def __enter__(self):
+        with self.lock:
+            self.depth += 1
 
     def __exit__(self, *exc_info):
-        self.commit()
+        with self.lock:
+            self.depth -= 1
+            if not self.depth:
+                self.commit()
 
     def commit(self):
-        self.db.commit()
+        """Write all pending entries to the database"""
+        with self.lock:
+            if not self.pending or not self.connect():
+                self.pending.clear()
+                return
+            rows = [
+                (key, pickle.dumps(value), expires)
+                for key, (value, expires) in self.pending.items()
+            ]
+            self.pending.clear()
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO data VALUES (?,?,?)", rows)
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def purge(self, timestamp=None):
+        """Delete all expired entries and return their number"""
+        if not self.connect():
+            return 0
+        with self.lock:
+            cursor = self.db.execute(
+                "DELETE FROM data WHERE expires <= ?",
+                (int(timestamp or time.time()),))
+            return cursor.rowcount
+
+    def vacuum(self):
+        """Rebuild the database file to release unused space"""
+        if self.connect():
+            with self.lock:
+                self.db.execute("VACUUM")
+
+    def add_stats(self, stats):
+        """Add the hit and miss counts in 'stats' to the stored ones"""
+        if not stats or not self.connect():
+            return
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            for key, (hits, misses) in stats.items():
+                self.db.execute(
+                    "INSERT OR IGNORE INTO stats VALUES (?,0,0)", (key,))
+                self.db.execute(
+                    "UPDATE stats SET hits=hits+?, misses=misses+? "
+                    "WHERE key=?", (hits, misses, key))
+            self.db.execute("COMMIT")
+
+    def stats(self):
+        """Return (key, entries, size, hits, misses) for each function"""
+        if not self.connect():
+            return []
+        with self.lock:
+            result = {
+                key: [key, 0, 0, hits, misses]
+                for key, hits, misses in self.db.execute(
+                    "SELECT key, hits, misses FROM stats")
+            }
+            for key, size in self.db.execute(
+                    "SELECT key, length(value) FROM data"):
+                # keys are 'module.function' or 'module.function-argument'
+                key = key.partition("-")[0]
+                if key not in result:
+                    result[key] = [key, 0, 0, 0, 0]
+                result[key][1] += 1
+                result[key][2] += size
+        return sorted(tuple(entry) for entry in result.values())
 
 
 class CacheDecorator():
@@ -146,9 +292,15 @@ class CacheDecorator():
             key = self.key
         else:
             key = "%s-%s" % (self.key, args[self.keyarg])
+        try:
+            stats = STATS[self.key]
+        except KeyError:
+            stats = STATS[self.key] = [0, 0]
         try:
             result, _ = self.cache[key, timestamp]
+            stats[0] += 1
         except CacheInvalidError:
+            stats[1] += 1
             with self.cache:
                 result = self.func(*args, **kwargs)
                 expires = int(timestamp + self.maxage)
@@ -175,9 +327,21 @@ def build_cache_decorator(*modules):
 MEMCACHE = MemoryCache()
 memcache = build_cache_decorator(MEMCACHE)
 
-try:
-    DBCACHE = DatabaseCache()
-    cache = build_cache_decorator(MEMCACHE, DBCACHE)
-except RuntimeError():
-    DBCACHE = None
-    cache = memcache
+DBCACHE = DatabaseCache()
+cache = build_cache_decorator(MEMCACHE, DBCACHE)
+
+# hit and miss counts of all decorated functions in this process
+STATS = {}
+
+
+def _finalize():
+    """Store statistics and remove expired entries of an opened database"""
+    if DBCACHE.db:
+        try:
+            DBCACHE.commit()
+            DBCACHE.add_stats(STATS)
+            DBCACHE.purge()
+        except sqlite3.Error:
+            pass
+
+atexit.register(_finalize)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Shared connections to SQLite databases"""
+
+import os
+import sqlite3
+import threading
+
+_connections = {}
+_lock = threading.Lock()
+
+
+def connect(path, *statements):
+    """Return a (connection, lock) tuple for the database at 'path'
+
+    All users of the same file share one connection, which may be used
+    from any thread while holding its lock. 'statements' set up the
+    tables a caller needs, e.g. 'CREATE TABLE IF NOT EXISTS ...'.
+    """
+    path = os.path.expanduser(os.path.expandvars(path))
+    with _lock:
+        try:
+            db, lock = _connections[path]
+        except KeyError:
+            db = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                 check_same_thread=False)
+            lock = threading.Lock()
+            _connections[path] = (db, lock)
+    with lock:
+        for statement in statements:
+            db.execute(statement)
+    return db, lock
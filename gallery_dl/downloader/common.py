@@ -14,20 +14,27 @@ class BasicDownloader():
     """Base class for downloader modules"""
 
     max_tries = 5
+    resumable = False
 
-    def download(self, url, fileobj):
-        """Download the resource at 'url' and write it to a file-like object"""
+    def download(self, url, fileobj, partial=False):
+        """Download the resource at 'url' and write it to a file-like object
+
+        If 'partial' is True, the data already in 'fileobj' is kept and
+        only the remaining part of the resource is appended. Incomplete
+        files are then also kept for later attempts.
+        """
         try:
-            return self.download_impl(url, fileobj)
+            return self.download_impl(url, fileobj, partial)
         except:
-            # remove file if download failed
-            try:
-                fileobj.close()
-                os.unlink(fileobj.name)
-            except AttributeError:
-                pass
+            # remove file if download failed and can't be resumed
+            if not partial:
+                try:
+                    fileobj.close()
+                    os.unlink(fileobj.name)
+                except AttributeError:
+                    pass
             raise
 
-    def download_impl(self, url, file_handle):
+    def download_impl(self, url, file_handle, partial=False):
         """Actual implementaion of the download process"""
         pass
@@ -8,49 +8,363 @@
 
 """Downloader module for http urls"""
 
+import os
 import time
+import threading
+import http.client
 import requests
+import urllib3
 from .common import BasicDownloader
+from .. import config, session, exception
+from ..retry import Retry, raise_for_status
+
+# urllib3 versions known to keep the http.client response of a streamed
+# request in '_fp'; others get the generic 'iter_content' path
+_HTTPLIB_FP = urllib3.__version__.partition(".")[0] in ("1", "2")
 
 class Downloader(BasicDownloader):
 
-    def __init__(self, printer):
+    resumable = True
+
+    def __init__(self, printer, category=None):
         BasicDownloader.__init__(self)
-        self.session = requests.session()
+        self.session = session.create(category)
+        self.category = category
         self.printer = printer
+        self.segments = config.get(("downloader", "segments"), 1)
+        self.segment_threshold = config.get(
+            ("downloader", "segment-threshold"), 16*1024*1024)
+        self.chunk_size = config.get(("downloader", "chunk-size"), 65536)
+        self.preallocate = config.get(("downloader", "preallocate"), False)
 
-    def download_impl(self, url, file):
-        tries = 0
+    def download_impl(self, url, file, partial=False):
+        retry = Retry(self.category)
+        segmented = True
+        # the size of a partial file tells where to continue from,
+        # which reserved but unwritten space would falsify
+        preallocate = self.preallocate and not partial
+        self.recover(file)
         while True:
+            # continue after the data that has already been written;
+            # byte offsets only match the file without content encoding
+            headers = None
+            offset = 0
+            if hasattr(file, "tell"):
+                headers = {"Accept-Encoding": "identity"}
+                offset = file.tell()
+                if offset:
+                    headers["Range"] = "bytes={}-".format(offset)
+
             # try to connect to remote source
             try:
-                response = self.session.get(url, stream=True, verify=True)
+                response = self.session.get(
+                    url, stream=True, verify=True, headers=headers)
             except requests.exceptions.ConnectionError as exptn:
-                tries += 1
-                self.printer.error(file, exptn, tries, self.max_tries)
-                time.sleep(1)
-                if tries == self.max_tries:
+                delay = retry.connect_error()
+                self.printer.error(file, exptn, retry.tries, retry.max_tries)
+                if delay is None:
                     raise
+                time.sleep(delay)
+                continue
+
+            # the range starts at or after the end of the resource
+            if offset and response.status_code == 416:
+                response.close()
+                if self.total_size(response) == offset:
+                    return retry.tries
+                # the existing data does not belong to this resource
+                file.seek(0)
+                file.truncate()
                 continue
 
             # reject error-status-codes
-            if response.status_code != requests.codes.ok:
-                tries += 1
+            if response.status_code not in (200, 206):
+                delay = retry.status_error(response)
                 self.printer.error(file, 'HTTP status "{} {}"'.format(
-                    response.status_code, response.reason), tries, self.max_tries)
+                    response.status_code, response.reason),
+                    retry.tries, retry.max_tries)
                 if response.status_code == 404:
-                    return self.max_tries
-                time.sleep(1)
-                if tries == self.max_tries:
-                    response.raise_for_status()
+                    raise exception.NotFoundError("file")
+                if delay is None:
+                    raise_for_status(response)
+                time.sleep(delay)
+                continue
+
+            # start from the beginning if the server ignored 'Range'
+            if offset and not self.is_continuation(response, offset):
+                file.seek(0)
+                file.truncate()
+                if response.status_code != 200:
+                    continue
+
+            # fetch large files over several connections
+            total = segmented and self.segmentable(response, file)
+            if total:
+                response.close()
+                tries = self.download_segmented(url, file, total)
+                if tries is not None:
+                    return retry.tries + tries
+                # the server stopped honoring 'Range' for some segments;
+                # continue with the rest over a single connection
+                segmented = False
                 continue
 
             # everything ok -- proceed to download
-            break
+            if preallocate:
+                self.allocate(response, file)
+            try:
+                self.receive(response, file)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError) as exptn:
+                delay = retry.read_error()
+                self.printer.error(file, exptn, retry.tries, retry.max_tries)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            finally:
+                if preallocate:
+                    # release the space after the data written so far
+                    file.truncate()
+            return retry.tries
+
+    def receive(self, response, file):
+        """Write the body of 'response' to 'file'"""
+        fp = getattr(response.raw, "_fp", None) if _HTTPLIB_FP else None
+        if (response.headers.get("Content-Encoding", "identity") != "identity"
+                or not isinstance(fp, http.client.HTTPResponse)):
+            for data in response.iter_content(self.chunk_size):
+                file.write(data)
+            return
+
+        # read the undecoded body from the underlying http.client response
+        # directly into one reusable buffer; its 'readinto' returns the
+        # data that arrived before a connection got closed, so that
+        # downloads can continue from there
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        readinto = fp.readinto
+        write = file.write
+        while True:
+            try:
+                size = readinto(buffer)
+            except (OSError, http.client.HTTPException) as exc:
+                response.close()
+                raise requests.exceptions.ConnectionError(exc)
+            if not size:
+                break
+            # errors while writing, like a full disk, are not retried
+            write(view[:size])
+        if fp.length:
+            response.close()
+            raise requests.exceptions.ChunkedEncodingError(
+                "Connection closed with {} bytes left".format(fp.length))
+        response.raw.release_conn()
+
+    @staticmethod
+    def allocate(response, file):
+        """Reserve disk space for the remaining content of 'response'"""
+        try:
+            length = int(response.headers["Content-Length"])
+            os.posix_fallocate(file.fileno(), file.tell(), length)
+        except (KeyError, ValueError, AttributeError, OSError):
+            pass
+
+    @staticmethod
+    def is_continuation(response, offset):
+        """Return True if 'response' contains data starting at 'offset'"""
+        headers = response.headers
+        crange = headers.get("Content-Range", "")
+        return (response.status_code == 206 and
+                crange.startswith("bytes {}-".format(offset)) and
+                headers.get("Content-Encoding", "identity") == "identity")
+
+    @staticmethod
+    def total_size(response):
+        """Return the total size from a 'Content-Range: */N' header"""
+        crange = response.headers.get("Content-Range", "")
+        if not crange.startswith("bytes */"):
+            return None
+        try:
+            return int(crange[8:])
+        except ValueError:
+            return None
+
+    def segmentable(self, response, file):
+        """Return the total size of the resource behind 'response' if it
+        should be downloaded in segments, otherwise 0"""
+        if self.segments < 2 or not hasattr(file, "fileno"):
+            return 0
+        headers = response.headers
+        if headers.get("Content-Encoding", "identity") != "identity":
+            return 0
+        if response.status_code == 206:
+            total = headers.get("Content-Range", "").rpartition("/")[2]
+        elif headers.get("Accept-Ranges") == "bytes":
+            total = headers.get("Content-Length")
+        else:
+            return 0
+        try:
+            total = int(total)
+        except (TypeError, ValueError):
+            return 0
+        if total - file.tell() < self.segment_threshold:
+            return 0
+        return total
+
+    def download_segmented(self, url, file, total):
+        """Download the rest of a 'total' bytes large file using multiple
+        connections and write each segment at its offset
+
+        Return the number of retries, or None if a segment request was
+        not answered with the requested range.
+
+        Until all segments are complete, the size of 'file' says nothing
+        about how much of it has been downloaded. A marker file next to
+        it records the size of its valid data in the meantime, which is
+        where recover() lets a killed download continue from.
+        """
+        start = file.tell()
+        marker = self.marker_path(file)
+        with open(marker, "w") as fp:
+            fp.write(str(start))
+        file.flush()
+        file.truncate(total)
+        step = -(-(total - start) // self.segments)
+        bounds = [
+            (pos, min(pos + step, total))
+            for pos in range(start, total, step)
+        ]
+        progress = [0] * len(bounds)
+        results = [None] * len(bounds)
+        stop = threading.Event()
+        threads = [
+            threading.Thread(
+                target=self.fetch_segment,
+                args=(url, file, bounds, progress, results, index, stop),
+                daemon=True,
+            )
+            for index in range(len(bounds))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except BaseException:
+            # stop all segments and keep what is contiguous, unless some
+            # are still busy writing; the marker covers that case
+            stop.set()
+            for thread in threads:
+                thread.join(1.0)
+            if not any(thread.is_alive() for thread in threads):
+                self.truncate_segments(file, bounds, progress, marker)
+            raise
+
+        if any(not isinstance(result, int) or result is False
+               for result in results):
+            self.truncate_segments(file, bounds, progress, marker)
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+            return None
+        file.seek(total)
+        os.unlink(marker)
+        return sum(results)
+
+    @staticmethod
+    def truncate_segments(file, bounds, progress, marker):
+        """Cut 'file' down to the contiguous part of its segments"""
+        for (begin, end), done in zip(bounds, progress):
+            if begin + done < end:
+                break
+        file.truncate(begin + done)
+        file.seek(begin + done)
+        os.unlink(marker)
+
+    @staticmethod
+    def marker_path(file):
+        """Return the path of the marker file for segments of 'file'"""
+        return file.name + ".seg"
+
+    def recover(self, file):
+        """Discard data of an unfinished segmented download of 'file'"""
+        name = getattr(file, "name", None)
+        if not isinstance(name, str) or not hasattr(file, "truncate"):
+            return
+        marker = self.marker_path(file)
+        try:
+            with open(marker) as fp:
+                offset = int(fp.read())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            offset = 0
+        if file.tell() > offset:
+            file.seek(offset)
+            file.truncate()
+        os.unlink(marker)
+
+    def fetch_segment(self, url, file, bounds, progress, results, index,
+                      stop):
+        """Thread target: download the byte range 'bounds[index]'
 
-        for data in response.iter_content(16384):
-            file.write(data)
-        return tries
+        Store the number of retries, the exception that ended the
+        download, or False if the server ignored the range request,
+        in 'results[index]'. Return early once 'stop' is set.
+        """
+        begin, end = bounds[index]
+        retry = Retry(self.category)
+        try:
+            with open(file.name, "r+b") as fp:
+                while True:
+                    pos = begin + progress[index]
+                    if pos >= end:
+                        results[index] = retry.tries
+                        return
+                    fp.seek(pos)
+                    headers = {
+                        "Range": "bytes={}-{}".format(pos, end-1),
+                        "Accept-Encoding": "identity",
+                    }
+                    try:
+                        response = self.session.get(
+                            url, stream=True, verify=True, headers=headers)
+                    except requests.exceptions.ConnectionError as exptn:
+                        delay = retry.connect_error()
+                        self.printer.error(
+                            file, exptn, retry.tries, retry.max_tries)
+                        if delay is None:
+                            raise
+                        time.sleep(delay)
+                        continue
+                    if response.status_code >= 400:
+                        delay = retry.status_error(response)
+                        if delay is None:
+                            raise_for_status(response)
+                        time.sleep(delay)
+                        continue
+                    if not self.is_continuation(response, pos):
+                        response.close()
+                        results[index] = False
+                        return
+                    try:
+                        for data in response.iter_content(self.chunk_size):
+                            if stop.is_set():
+                                response.close()
+                                return
+                            fp.write(data)
+                            progress[index] += len(data)
+                    except (requests.exceptions.ConnectionError,
+                            requests.exceptions.ChunkedEncodingError) as exptn:
+                        delay = retry.read_error()
+                        self.printer.error(
+                            file, exptn, retry.tries, retry.max_tries)
+                        if delay is None:
+                            raise
+                        time.sleep(delay)
+        except Exception as exc:
+            results[index] = exc
 
     def set_headers(self, headers):
         """Set headers for http requests"""
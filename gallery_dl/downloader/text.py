@@ -15,6 +15,6 @@ class Downloader(BasicDownloader):
     def __init__(self, *args):
         BasicDownloader.__init__(self)
 
-    def download_impl(self, url, file):
+    def download_impl(self, url, file, partial=False):
         file.write(bytes(url[7:], "utf-8"))
         return 0
@@ -6,7 +6,11 @@
 # it under the terms of the GNU General Public License version 2 as
 # published by the Free Software Foundation.
 
+import os
 import re
+import json
+import heapq
+import tempfile
 import importlib
 from .. import config
 
@@ -67,12 +71,28 @@ modules = [
 
 def find(url):
     """Find suitable extractor for the given url"""
-    for pattern, klass in _list_patterns():
-        match = pattern.match(url)
-        if match:
-            return klass(match)
+    result = _match(url)
+    if result:
+        info, match = result
+        return _get_class(info)(match)
     return None
 
+def classify(urls):
+    """Yield an (extractor class, match) pair for each supported URL
+
+    Identical URLs are only reported once and URLs without a suitable
+    extractor are skipped.
+    """
+    seen = set()
+    for url in urls:
+        if url in seen:
+            continue
+        seen.add(url)
+        result = _match(url)
+        if result:
+            info, match = result
+            yield _get_class(info), match
+
 def extractors():
     """Yield all available extractor classes"""
     return sorted(
@@ -80,11 +100,27 @@ def extractors():
         key=lambda x: x.__name__
     )
 
+def manifest():
+    """Return a list of dicts describing all extractor classes
+
+    Each dict contains 'module', 'class', 'category', 'subcategory',
+    'pattern', 'doc' and 'example'. The list is read from a manifest file
+    ('cache.manifest') and only rebuilt by importing all extractor modules
+    if this file is missing or out of date.
+    """
+    global _manifest
+    if _manifest is None:
+        _manifest = _load_manifest() or _build_manifest()
+    return _manifest
+
 # --------------------------------------------------------------------
 # internals
 
 _cache = []
 _module_iter = iter(modules)
+_index = None
+_combined = {}
+_manifest = None
 
 def _list_patterns():
     """Yield all available (pattern, class) tuples"""
@@ -100,6 +136,62 @@ def _list_patterns():
         _cache.extend(tuples)
         yield from tuples
 
+def _get_class(info):
+    """Return the extractor class described by a manifest entry"""
+    module = importlib.import_module("."+info["module"], __package__)
+    return getattr(module, info["class"])
+
+def _manifest_path():
+    return os.path.expanduser(config.get(("cache", "manifest"), os.path.join(
+        tempfile.gettempdir(), ".gallery-dl.manifest")))
+
+def _manifest_stamp():
+    """Return the version and module modification times to check against"""
+    from .. import __version__
+    directory = os.path.dirname(__file__)
+    mtimes = [
+        os.stat(os.path.join(directory, name + ".py")).st_mtime
+        for name in modules + ["__init__", "common"]
+    ]
+    return [__version__, modules, mtimes]
+
+def _load_manifest():
+    """Return the extractor list stored in the manifest file if up to date"""
+    try:
+        with open(_manifest_path()) as file:
+            data = json.load(file)
+        if data["stamp"] == _manifest_stamp():
+            return data["extractors"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def _build_manifest():
+    """Import all extractor modules and store their description"""
+    extractors = []
+    for module_name in modules:
+        module = importlib.import_module("."+module_name, __package__)
+        for klass in _get_classes(module):
+            test = getattr(klass, "test", None)
+            extractors.append({
+                "module": module_name,
+                "class": klass.__name__,
+                "category": klass.category,
+                "subcategory": klass.subcategory,
+                "pattern": klass.pattern,
+                "doc": klass.__doc__,
+                "example": test[0][0] if test else None,
+            })
+    try:
+        path = _manifest_path()
+        with open(path + ".tmp", "w") as file:
+            json.dump({"stamp": _manifest_stamp(),
+                       "extractors": extractors}, file)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+    return extractors
+
 def _get_classes(module):
     """Return a list of all extractor classes in a module"""
     return [
@@ -107,3 +199,95 @@ def _get_classes(module):
             hasattr(klass, "pattern") and klass.__module__ == module.__name__
         )
     ]
+
+def _match(url):
+    """Return (info, match) for the first pattern matching 'url' or None
+
+    All candidate patterns for a URL are combined into a single regular
+    expression, which is compiled once for each set of index keys. The
+    group that matched tells which pattern it was, and only this one
+    pattern is matched again to get its own match object.
+    """
+    keys = _lookup_keys(url)
+    try:
+        regex, groups = _combined[keys]
+    except KeyError:
+        regex, groups = _combined[keys] = _combine(
+            heapq.merge(*[_index[key] for key in keys]))
+    match = regex.match(url)
+    if not match:
+        return None
+    pattern, info = groups[match.lastindex]
+    return info, re.match(pattern, url)
+
+def _combine(entries):
+    """Return a combined regex and a map of its groups to (pattern, info)"""
+    alternatives = []
+    groups = {}
+    index = 1
+    for _, pattern, info in entries:
+        alternatives.append("(" + pattern + ")")
+        groups[index] = (pattern, info)
+        index += re.compile(pattern).groups + 1
+    return re.compile("|".join(alternatives) or "(?!)"), groups
+
+def _lookup_keys(url):
+    """Return a tuple of all index keys with patterns that might match 'url'
+
+    Patterns are looked up by the URL's scheme and by every suffix of its
+    hostname, e.g. 'www.pixiv.net', 'pixiv.net' and 'net'. Patterns
+    without a recognizable hostname or scheme get checked for every URL.
+    Their position in '_list_patterns()' keeps the original precedence.
+    """
+    index = _index or _build_index()
+    keys = []
+    pos = url.find(":")
+    if pos > 0 and url[:pos+1] in index:
+        keys.append(url[:pos+1])
+    match = _url_host.search(url)
+    host = match.group() if match else ""
+    while host:
+        if host in index:
+            keys.append(host)
+        host = host.partition(".")[2]
+    keys.append(None)
+    return tuple(keys)
+
+def _build_index():
+    """Map hostnames and schemes to lists of (position, pattern, info)"""
+    global _index
+    index = {None: []}
+    position = 0
+    for info in manifest():
+        for pattern in info["pattern"]:
+            key = _pattern_key(pattern)
+            index.setdefault(key, []).append((position, pattern, info))
+            position += 1
+    _index = index
+    return index
+
+def _pattern_key(pattern):
+    """Return the index key for a regular expression or None"""
+    match = _pattern_scheme.match(pattern)
+    if not match:
+        match = re.match(r"([a-z]+):", pattern)
+        return match.group() if match else None
+
+    rest = pattern[match.end():]
+    match = _pattern_host.search(rest)
+    if not match:
+        return None
+    prefix = rest[:match.start()]
+    if "/" in prefix or ".*" in prefix or ".+" in prefix:
+        return None
+    # dots in a hostname are meant literally, even if unescaped
+    key = match.group().replace("\\", "")
+    if prefix and not prefix.endswith(("(", "(?:", "\\.", "\\.)?")):
+        # the first label is only the tail of a longer hostname
+        key = key.partition(".")[2]
+    return key or None
+
+_url_host = re.compile(r"[^/:.]*\.[^/?#]*")
+_pattern_scheme = re.compile(r"(?:\(\?:https\?://\)\?|https\?://)")
+_pattern_host = re.compile(
+    r"(?:[a-z0-9-]+\\?\.)*[a-z0-9-]+(?=/|\(+(?:\?:)?/|\$|$)")
@@ -10,6 +10,7 @@
 
 from .common import AsynchronousExtractor, Message
 from .. import text, iso639_1
+import itertools
 import re
 
 class BatotoChapterExtractor(AsynchronousExtractor):
@@ -34,23 +35,28 @@ class BatotoChapterExtractor(AsynchronousExtractor):
         })
 
     def items(self):
-        params = {
-            "id": self.token,
-            "p": 1,
-            "supress_webtoon": "t",
-        }
-        page = self.request(self.url, params=params).text
+        page = self.fetch_page(1)
         data = self.get_job_metadata(page)
         yield Message.Version, 1
         yield Message.Directory, data.copy()
-        for i in range(int(data["count"])):
-            next_url, image_url = self.get_page_urls(page)
+        # reader pages are addressed by their number,
+        # so all of them can be requested at once
+        count = int(data["count"])
+        pages = self.map_parallel(self.fetch_page, range(2, count+1))
+        for i, page in enumerate(itertools.chain((page,), pages), 1):
+            _, image_url = self.get_page_urls(page)
             text.nameext_from_url(image_url, data)
-            data["page"] = i+1
+            data["page"] = i
             yield Message.Url, image_url, data.copy()
-            if next_url:
-                params["p"] += 1
-                page = self.request(self.url, params=params).text
+
+    def fetch_page(self, num):
+        """Return the content of reader page 'num'"""
+        params = {
+            "id": self.token,
+            "p": num,
+            "supress_webtoon": "t",
+        }
+        return self.request(self.url, params=params).text
 
     def get_job_metadata(self, page):
         """Collect metadata for extractor-job"""
@@ -8,10 +8,13 @@
 
 """Base classes for extractors for danbooru and co"""
 
-from .common import Extractor, Message
-from .. import text
+from .common import Extractor, Message, ordered_map
+from .. import config, text
 import xml.etree.ElementTree as ET
+import io
+import re
 import json
+import codecs
 import urllib.parse
 
 class BooruExtractor(Extractor):
@@ -21,10 +24,13 @@ class BooruExtractor(Extractor):
     page = "page"
     api_url = ""
     category = ""
+    archive_fmt = "{id}"
 
     def __init__(self):
         Extractor.__init__(self)
         self.params = {"limit": 50}
+        self.prefetch = config.interpolate(
+            ("extractor", self.category, "prefetch"), 0)
         self.setup()
 
     def items(self):
@@ -38,7 +44,61 @@ class BooruExtractor(Extractor):
                 continue
 
     def items_impl(self):
-        pass
+        """Yield the data of all posts, page by page
+
+        Paging stops at the first page with less than 'limit' posts.
+        Once the first page has come back full, up to 'prefetch' further
+        pages are requested while the posts of the current one are being
+        processed.
+        """
+        params = self.iter_params()
+        posts = self.request_page(next(params))
+        yield from posts
+        if len(posts) < self.params["limit"] or self.abort_paging():
+            return
+
+        pages = ordered_map(self.request_page, params, self.prefetch + 1)
+        try:
+            for posts in pages:
+                yield from posts
+                if len(posts) < self.params["limit"] or self.abort_paging():
+                    return
+        finally:
+            pages.close()
+
+    def iter_params(self):
+        """Yield the request parameters for each page"""
+        self.update_page(reset=True)
+        while True:
+            yield self.params.copy()
+            self.update_page()
+
+    def request_page(self, params):
+        """Return a list with the data of all posts on one page"""
+        return []
+
+    def request_posts(self, params, parse, headers=None):
+        """Request one API page and 'parse' its body while it arrives
+
+        'parse' gets a binary file object and yields the posts in it,
+        so neither the whole body nor its decoded text has to be held
+        in memory.
+        """
+        if self.http_cache:
+            # cached responses are only available as a whole
+            content = self.request(self.api_url, verify=True, params=params,
+                                   headers=headers).content
+            return list(parse(io.BytesIO(content)))
+        response = self.request(self.api_url, verify=True, params=params,
+                                headers=headers, stream=True)
+        try:
+            response.raw.decode_content = True
+            posts = list(parse(response.raw))
+        except BaseException:
+            response.close()
+            raise
+        response.raw.release_conn()
+        return posts
 
     def setup(self):
         pass
@@ -74,33 +134,14 @@ class BooruExtractor(Extractor):
 
 class JSONBooruExtractor(BooruExtractor):
     """Base class for JSON based API responses"""
-    def items_impl(self):
-        self.update_page(reset=True)
-        while True:
-            images = json.loads(
-                self.request(self.api_url, verify=True, params=self.params,
-                             headers=self.headers).text
-            )
-            for data in images:
-                yield data
-            if len(images) < self.params["limit"]:
-                return
-            self.update_page()
+    def request_page(self, params):
+        return self.request_posts(params, iter_json_array, self.headers)
 
 
 class XMLBooruExtractor(BooruExtractor):
     """Base class for XML based API responses"""
-    def items_impl(self):
-        self.update_page(reset=True)
-        while True:
-            root = ET.fromstring(
-                self.request(self.api_url, verify=True, params=self.params).text
-            )
-            for item in root:
-                yield item.attrib
-            if len(root) < self.params["limit"]:
-                return
-            self.update_page()
+    def request_page(self, params):
+        return self.request_posts(params, iter_xml_items)
 
 
 class BooruTagExtractor(BooruExtractor):
@@ -146,3 +187,68 @@ class BooruPostExtractor(BooruExtractor):
         BooruExtractor.__init__(self)
         self.post = match.group(1)
         self.params["tags"] = "id:" + self.post
+
+
+def iter_json_array(fp, chunk_size=65536):
+    """Yield the elements of the JSON array in binary file 'fp'
+
+    Each element is decoded as soon as it has been read completely.
+    Anything other than an array at the top level yields nothing.
+    """
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    scan = json.JSONDecoder().scan_once
+    skip = _json_skip.match
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        pos = skip(buf, pos).end()
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    value = json.loads(buf[pos:] + decode(fp.read(), True))
+                    yield from value if isinstance(value, list) else ()
+                    return
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                value, end = scan(buf, pos)
+            except (ValueError, StopIteration):
+                if eof:
+                    raise ValueError("Incomplete or invalid JSON array")
+            else:
+                # a number at the end of the buffer might continue
+                if end < len(buf) or eof or isinstance(value, (dict, list)):
+                    yield value
+                    pos = end
+                    continue
+        elif eof:
+            return
+        data = fp.read(chunk_size)
+        eof = not data
+        buf = buf[pos:] + decode(data, eof)
+        pos = 0
+
+
+def iter_xml_items(fp):
+    """Yield the attributes of all children of the root element in 'fp'"""
+    depth = 0
+    for event, elem in ET.iterparse(fp, ("start", "end")):
+        if event == "start":
+            if not depth:
+                root = elem
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 1:
+                yield elem.attrib
+                # drop finished elements to keep the tree small
+                root.clear()
+
+
+_json_skip = re.compile(r"[\s,]*")
@@ -8,12 +8,17 @@
 
 """Common classes and constants used by extractor modules."""
 
+import re
 import time
+import codecs
 import queue
 import requests
 import threading
+import collections
+import concurrent.futures
 from .message import Message
-from .. import config
+from .. import config, session, httpcache
+from ..retry import Retry, raise_for_status
 
 class Extractor():
 
@@ -21,9 +26,26 @@ class Extractor():
     subcategory = ""
     directory_fmt = [""]
     filename_fmt = ""
+    archive_fmt = ""
+    archive = None
+    parent_data = None
 
     def __init__(self):
-        self.session = requests.Session()
+        self.session = session.create(self.category)
+        self.skipped = 0
+        self.abort = config.interpolate(
+            ("extractor", self.category, "abort"), 0
+        )
+        self.encoding = config.interpolate(
+            ("extractor", self.category, "encoding")
+        )
+        self.fetch_workers = config.interpolate(
+            ("extractor", self.category, "fetch-workers"), 1
+        )
+        self.http_cache = None
+        path = config.interpolate(("extractor", self.category, "http-cache"))
+        if path:
+            self.http_cache = httpcache.ResponseCache(path, self.category)
 
     def __iter__(self):
         return self.items()
@@ -32,11 +54,34 @@ class Extractor():
         yield Message.Version, 1
         return
 
+    def skip(self, skipped=True):
+        """Count consecutive items that have already been downloaded"""
+        self.skipped = self.skipped + 1 if skipped else 0
+
+    def abort_paging(self):
+        """Return True if pagination should stop early
+
+        This is the case after 'abort' consecutive items have been skipped
+        because they were already downloaded.
+        """
+        return 0 < self.abort <= self.skipped
+
     def request(self, url, encoding=None, *args, **kwargs):
-        response = safe_request(self.session, url, *args, **kwargs)
+        if (self.http_cache and not args and "data" not in kwargs and
+                not kwargs.get("stream") and
+                kwargs.get("method", "GET").upper() == "GET"):
+            response = self.http_cache.request(self.session, url, **kwargs)
+        else:
+            response = safe_request(self.session, url, *args, **kwargs)
+        if not kwargs.get("stream"):
+            encoding = resolve_encoding(response, encoding, self.encoding)
         response.encoding = encoding
         return response
 
+    def map_parallel(self, func, iterable):
+        """Like map(), but with up to 'fetch-workers' calls running at once"""
+        return ordered_map(func, iterable, self.fetch_workers)
+
 
 class AsynchronousExtractor(Extractor):
 
@@ -71,25 +116,103 @@ class AsynchronousExtractor(Extractor):
 
 
 def safe_request(session, url, method="GET", *args, **kwargs):
-    tries = 0
+    retry = Retry(getattr(session, "category", None))
     while True:
         # try to connect to remote source
         try:
             r = session.request(method, url, *args, **kwargs)
         except requests.exceptions.ConnectionError:
-            tries += 1
-            time.sleep(1)
-            if tries == 5:
+            delay = retry.connect_error()
+            if delay is None:
                 raise
+            time.sleep(delay)
             continue
 
         # reject error-status-codes
-        if r.status_code != requests.codes.ok:
-            tries += 1
-            time.sleep(1)
-            if tries == 5:
-                r.raise_for_status()
+        # ('304 Not Modified' is only sent for conditional requests)
+        if r.status_code not in (requests.codes.ok,
+                                 requests.codes.not_modified):
+            delay = retry.status_error(r)
+            if delay is None:
+                raise_for_status(r)
+            time.sleep(delay)
             continue
 
         # everything ok -- proceed to download
         return r
+
+
+def resolve_encoding(response, encoding=None, default=None):
+    """Return the text encoding of 'response' or None if it is unknown
+
+    Candidates are tried in this order: 'encoding' as requested by the
+    caller, the charset in the Content-Type header, the per-category
+    'default', a byte order mark and a <meta> or XML declaration within
+    the first 1024 bytes. None leaves it to 'requests' to detect the
+    encoding from the whole content, which is slow for large pages.
+    """
+    ctype = response.headers.get("Content-Type", "")
+    match = _charset_header(ctype)
+    for encoding in (encoding, match and match.group(1), default):
+        if encoding and _known_encoding(encoding):
+            return encoding
+
+    head = response.content[:1024]
+    for bom, encoding in _boms:
+        if head.startswith(bom):
+            return encoding
+    if "json" in ctype:
+        return "utf-8"
+    match = _charset_meta(head)
+    if match:
+        encoding = (match.group(1) or match.group(2)).decode("ascii")
+        if _known_encoding(encoding):
+            return encoding
+    return None
+
+
+def _known_encoding(name):
+    try:
+        codecs.lookup(name)
+        return True
+    except LookupError:
+        return False
+
+
+_charset_header = re.compile(
+    r"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE).search
+_charset_meta = re.compile(
+    br"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)|"""
+    br"""<\?xml[^>]+encoding\s*=\s*["']([\w.:-]+)""", re.IGNORECASE).search
+_boms = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def ordered_map(func, iterable, workers):
+    """Yield func(item) for each item of 'iterable' in order
+
+    Up to 'workers' calls run concurrently in a thread pool. Items are
+    taken from 'iterable' only as results are consumed, so it may be
+    infinite; closing the generator cancels all pending calls.
+    """
+    if workers <= 1:
+        yield from map(func, iterable)
+        return
+    executor = concurrent.futures.ThreadPoolExecutor(workers)
+    futures = collections.deque()
+    try:
+        for item in iterable:
+            futures.append(executor.submit(func, item))
+            if len(futures) >= workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
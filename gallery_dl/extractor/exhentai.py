@@ -9,10 +9,8 @@
 """Extract images from galleries at https://exhentai.org/"""
 
 from .common import Extractor, Message
-from .. import config, text, iso639_1, exception
+from .. import config, text, iso639_1, ratelimit, exception
 from ..cache import cache
-import time
-import random
 
 class ExhentaiGalleryExtractor(Extractor):
     """Extractor for image-galleries from exhentai.org"""
@@ -20,6 +18,7 @@ class ExhentaiGalleryExtractor(Extractor):
     subcategory = "gallery"
     directory_fmt = ["{category}", "{gallery-id}"]
     filename_fmt = "{gallery-id}_{num:>04}_{imgkey}_{name}.{extension}"
+    archive_fmt = "{gallery-id}_{imgkey}"
     pattern = [r"(?:https?://)?(g\.e-|ex)hentai\.org/g/(\d+)/([\da-f]{10})"]
     api_url = "https://exhentai.org/api.php"
 
@@ -27,6 +26,13 @@ class ExhentaiGalleryExtractor(Extractor):
         Extractor.__init__(self)
         self.url = match.group(0)
         self.version, self.gid, self.token = match.groups()
+        wait_min = config.interpolate(("extractor", "exhentai", "wait-min"), 3)
+        wait_max = config.interpolate(("extractor", "exhentai", "wait-max"), 6)
+        # one request every 'wait-min' seconds plus up to
+        # 'wait-max' - 'wait-min' seconds of random delay
+        if wait_min > 0:
+            ratelimit.set_defaults(self.category, 1 / wait_min, 1,
+                                   max(wait_max - wait_min, 0))
         self.login()
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0",
@@ -34,10 +40,6 @@ class ExhentaiGalleryExtractor(Extractor):
             "Accept-Language": "en-US,en;q=0.5",
             "Referer": "https://exhentai.org/",
         })
-        self.wait_min = config.interpolate(("extractor", "exhentai", "wait-min"), 3)
-        self.wait_max = config.interpolate(("extractor", "exhentai", "wait-max"), 6)
-        if self.wait_max < self.wait_min:
-            self.wait_max = self.wait_min
 
     def items(self):
         yield Message.Version, 1
@@ -60,8 +62,6 @@ class ExhentaiGalleryExtractor(Extractor):
             image.update(data)
             image["num"] = num
             text.nameext_from_url(image["url"], image)
-            if "/fullimg.php" in image[urlkey]:
-                self.wait((1, 2))
             yield Message.Url, image[urlkey], image
 
     def get_job_metadata(self, page):
@@ -92,7 +92,6 @@ class ExhentaiGalleryExtractor(Extractor):
 
     def get_images(self, url):
         """Collect url and metadata for all images in this gallery"""
-        self.wait()
         page = self.request(url).text
         data, pos = text.extract_all(page, (
             (None         , '<div id="i3"><a onclick="return load_image(', ''),
@@ -121,7 +120,6 @@ class ExhentaiGalleryExtractor(Extractor):
         while True:
             if data["imgkey"] == data["imgkey-next"]:
                 return
-            self.wait()
             page = self.session.post(self.api_url, json=request).json()
             data["imgkey"] = data["imgkey-next"]
             data["imgkey-next"], pos = text.extract(page["i3"], "'", "'")
@@ -136,14 +134,6 @@ class ExhentaiGalleryExtractor(Extractor):
             request["imgkey"] = data["imgkey-next"]
             request["page"] += 1
 
-    def wait(self, waittime=None):
-        """Wait for a randomly chosen amount of seconds"""
-        if not waittime:
-            waittime = random.uniform(self.wait_min, self.wait_max)
-        else:
-            waittime = random.uniform(*waittime)
-        time.sleep(waittime)
-
     def login(self):
         """Login and set necessary cookies"""
         cookies = self._login_impl()
@@ -17,6 +17,7 @@ class HentaifoundryUserExtractor(Extractor):
     subcategory = "user"
     directory_fmt = ["{category}", "{artist}"]
     filename_fmt = "{category}_{index}_{title}.{extension}"
+    archive_fmt = "{index}"
     pattern = [
         r"(?:https?://)?(?:www\.)?hentai-foundry\.com/pictures/user/([^/]+)/?$",
         r"(?:https?://)?(?:www\.)?hentai-foundry\.com/user/([^/]+)/profile",
@@ -36,12 +37,14 @@ class HentaifoundryUserExtractor(Extractor):
         self.set_filters(token)
         yield Message.Version, 1
         yield Message.Directory, data
-        for url, image in self.get_images():
+        images = self.map_parallel(
+            self.get_image_metadata, self.get_image_urls())
+        for url, image in images:
             image.update(data)
             yield Message.Url, url, image
 
-    def get_images(self):
-        """Yield url and keywords for all images of one artist"""
+    def get_image_urls(self):
+        """Yield the urls of all image pages of one artist"""
         num = 1
         while True:
             pos = 0
@@ -51,7 +54,7 @@ class HentaifoundryUserExtractor(Extractor):
                 part, pos = text.extract(page, 'thumbTitle"><a href="/pictures/user/', '"', pos)
                 if not part:
                     return
-                yield self.get_image_metadata(self.url_base + part)
+                yield self.url_base + part
             num += 1
 
     def get_job_metadata(self):
@@ -111,6 +114,7 @@ class HentaifoundryImageExtractor(Extractor):
     subcategory = "image"
     directory_fmt = ["{category}", "{artist}"]
     filename_fmt = "{category}_{index}_{title}.{extension}"
+    archive_fmt = "{index}"
     pattern = [(r"(?:https?://)?(?:www\.)?hentai-foundry\.com/pictures/user/"
                 r"([^/]+)/(\d+)/[^/]+")]
     test = [("http://www.hentai-foundry.com/pictures/user/Orzy/76940/Youmu-Konpaku", {
@@ -36,8 +36,11 @@ class ImgboxGalleryExtractor(AsynchronousExtractor):
         self.metadata = self.get_job_metadata(page)
         yield Message.Version, 1
         yield Message.Directory, self.metadata
-        for match in re.finditer(r'<a href="([^"]+)"><img alt="', page):
-            imgpage = self.request(self.url_base + match.group(1)).text
+        urls = [
+            self.url_base + match.group(1)
+            for match in re.finditer(r'<a href="([^"]+)"><img alt="', page)
+        ]
+        for imgpage in self.map_parallel(self.fetch_page, urls):
             data = self.get_file_metadata(imgpage)
             data = text.nameext_from_url(data["filename"], data)
             yield Message.Url, self.get_file_url(imgpage), data
@@ -53,6 +56,10 @@ class ImgboxGalleryExtractor(AsynchronousExtractor):
             "count": parts[1][:-7],
         }
 
+    def fetch_page(self, url):
+        """Return the content of the image page at 'url'"""
+        return self.request(url).text
+
     def get_file_metadata(self, page):
         """Collect metadata for a downloadable file"""
         return text.extract_all(page, (
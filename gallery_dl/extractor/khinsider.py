@@ -44,10 +44,13 @@ class KhinsiderSoundtrackExtractor(AsynchronousExtractor):
 
     def get_album_tracks(self, page):
         pos = page.index("Download all songs at once:")
-        num = 0
-        for url in text.extract_iter(page, '<tr>\r\n\t\t<td><a href="', '"', pos):
-            page = self.request(url, encoding="utf-8").text
-            name, pos = text.extract(page, "Song name: <b>", "</b>")
-            url , pos = text.extract(page, '<p><a style="color: #21363f;" href="', '"', pos)
-            num += 1
-            yield url, text.nameext_from_url(name, {"num": num})
+        urls = text.extract_iter(page, '<tr>\r\n\t\t<td><a href="', '"', pos)
+        return self.map_parallel(self.get_track, enumerate(urls, 1))
+
+    def get_track(self, entry):
+        """Collect url and metadata for a (num, url) track entry"""
+        num, url = entry
+        page = self.request(url, encoding="utf-8").text
+        name, pos = text.extract(page, "Song name: <b>", "</b>")
+        url , pos = text.extract(page, '<p><a style="color: #21363f;" href="', '"', pos)
+        return url, text.nameext_from_url(name, {"num": num})
@@ -10,6 +10,7 @@
 
 from .common import AsynchronousExtractor, Extractor, Message
 from .. import text
+import itertools
 
 class MangareaderBase():
     """Base class for mangareader extractors"""
@@ -18,6 +19,25 @@ class MangareaderBase():
     filename_fmt = "{manga}_c{chapter:>03}_{page:>03}.{extension}"
     url_base = "http://www.mangareader.net"
 
+    @staticmethod
+    def parse_manga_page(page):
+        """Collect metadata about a manga from its summary page"""
+        data, pos = text.extract_all(page, (
+            (None, '<td class="propertytitle">Name:', ''),
+            ("manga", '<h2 class="aname">', '</h2>'),
+            (None, '<td class="propertytitle">Year of Release:', ''),
+            ('manga-release', '<td>', '</td>'),
+            (None, '<td class="propertytitle">Author:', ''),
+            ('author', '<td>', '</td>'),
+            (None, '<td class="propertytitle">Artist:', ''),
+            ('artist', '<td>', '</td>'),
+            (None, '<div id="readmangasum">', ''),
+        ))
+        for key in ("author", "artist"):
+            data[key] = text.unescape(data[key])
+        data["manga"] = data["manga"].strip()
+        return data, pos
+
 
 class MangareaderMangaExtractor(MangareaderBase, Extractor):
     """Extractor for mangas from mangareader.net"""
@@ -35,10 +55,18 @@ class MangareaderMangaExtractor(MangareaderBase, Extractor):
         yield Message.Version, 1
         url = self.url_base + self.url_title
         page = self.request(url).text
+        manga, pos = self.parse_manga_page(page)
+        manga["category"] = self.category
         needle = '<a href="' + self.url_title
-        pos = page.index('<div id="readmangasum">')
-        for chapter in text.extract_iter(page, needle, '"', pos):
-            yield Message.Queue, url + chapter
+        while True:
+            chapter, pos = text.extract(page, needle, '"', pos)
+            if chapter is None:
+                return
+            data, pos = text.extract_all(page, (
+                ('title', '</a> : ', '</td>'),
+                ('chapter-date', '<td>', '</td>'),
+            ), pos, manga.copy())
+            yield Message.Queue, url + chapter, data
 
 
 class MangareaderChapterExtractor(MangareaderBase, AsynchronousExtractor):
@@ -62,45 +90,65 @@ class MangareaderChapterExtractor(MangareaderBase, AsynchronousExtractor):
         data = self.get_job_metadata(page)
         yield Message.Version, 1
         yield Message.Directory, data
-        for i in range(1, int(data["count"])+1):
-            next_url, image_url, image_data = self.get_page_metadata(page)
+        urls = self.get_page_urls(page)
+        if len(urls) == int(data["count"]):
+            # fetch all reader pages from the page menu at once
+            pages = self.map_parallel(self.fetch_page, urls[1:])
+        else:
+            pages = self.follow_pages(page, int(data["count"]))
+        for i, page in enumerate(itertools.chain((page,), pages), 1):
+            _, image_url, image_data = self.get_page_metadata(page)
             image_data.update(data)
             image_data["page"] = i
             yield Message.Url, image_url, image_data
-            if next_url:
-                page = self.request(next_url).text
+
+    def fetch_page(self, url):
+        """Return the content of the reader page at 'url'"""
+        return self.request(url).text
+
+    def follow_pages(self, page, count):
+        """Yield the next 'count'-1 reader pages one after another"""
+        for _ in range(1, count):
+            next_url = self.get_page_metadata(page)[0]
+            if not next_url:
+                return
+            page = self.fetch_page(next_url)
+            yield page
 
     def get_job_metadata(self, chapter_page):
         """Collect metadata for extractor-job"""
-        page = self.request(self.url_base + self.url_title).text
-        data = {
+        parent = self.parent_data
+        if parent and parent.get("category") == self.category:
+            # everything from the manga page has been provided
+            # by the manga extractor that queued this chapter
+            data = parent.copy()
+        else:
+            page = self.request(self.url_base + self.url_title).text
+            data, pos = self.parse_manga_page(page)
+            data, _ = text.extract_all(page, (
+                ('title', ' ' + self.chapter + '</a> : ', '</td>'),
+                ('chapter-date', '<td>', '</td>'),
+            ), pos, data)
+        data.update({
             "category": self.category,
             "chapter": self.chapter,
             "lang": "en",
             "language": "English",
-        }
-        data, _ = text.extract_all(page, (
-            (None, '<td class="propertytitle">Name:', ''),
-            ("manga", '<h2 class="aname">', '</h2>'),
-            (None, '<td class="propertytitle">Year of Release:', ''),
-            ('manga-release', '<td>', '</td>'),
-            (None, '<td class="propertytitle">Author:', ''),
-            ('author', '<td>', '</td>'),
-            (None, '<td class="propertytitle">Artist:', ''),
-            ('artist', '<td>', '</td>'),
-            (None, '<div id="readmangasum">', ''),
-            ('title', ' ' + self.chapter + '</a> : ', '</td>'),
-            ('chapter-date', '<td>', '</td>'),
-        ), values=data)
+        })
         data, _ = text.extract_all(chapter_page, (
             (None, '<select id="pageMenu"', ''),
             ('count', '</select> of ', '</div>'),
         ), values=data)
-        for key in ("author", "artist"):
-            data[key] = text.unescape(data[key])
-        data["manga"] = data["manga"].strip()
         return data
 
+    def get_page_urls(self, page):
+        """Return the urls of all reader pages listed in the page menu"""
+        menu = text.extract(page, '<select id="pageMenu"', '</select>')[0]
+        return [
+            self.url_base + path
+            for path in text.extract_iter(menu or "", '<option value="', '"')
+        ]
+
     def get_page_metadata(self, page):
         """Collect next url, image-url and metadata for one manga-page"""
         extr = text.extract
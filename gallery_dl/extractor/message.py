@@ -13,4 +13,6 @@ class Message():
     Url = 3
     Headers = 4
     Cookies = 5
+    # Queue, url[, kwdict]: the optional kwdict is made available
+    # to the child extractor as its 'parent_data'
     Queue = 6
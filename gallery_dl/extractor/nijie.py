@@ -18,6 +18,7 @@ class NijieUserExtractor(AsynchronousExtractor):
     subcategory = "user"
     directory_fmt = ["{category}", "{artist-id}"]
     filename_fmt = "{category}_{artist-id}_{image-id}_p{index:>02}.{extension}"
+    archive_fmt = "{image-id}_{index}"
     pattern = [r"(?:https?://)?(?:www\.)?nijie\.info/members(?:_illust)?\.php\?id=(\d+)"]
     test = [("https://nijie.info/members_illust.php?id=44", {
         "url": "585d821df4716b1098660a0be426d01db4b65f2a",
@@ -43,8 +44,8 @@ class NijieUserExtractor(AsynchronousExtractor):
         images = self.get_image_ids()
         yield Message.Version, 1
         yield Message.Directory, data
-        for image_id in images:
-            for image_url, image_data in self.get_image_data(image_id):
+        for image_list in self.map_parallel(self.get_image_data, images):
+            for image_url, image_data in image_list:
                 image_data.update(data)
                 yield Message.Url, image_url, image_data
 
@@ -66,12 +67,14 @@ class NijieUserExtractor(AsynchronousExtractor):
         """Get URL and metadata for images specified by 'image_id'"""
         page = self.request(self.popup_url + image_id).text
         images = list(text.extract_iter(page, '<img src="//pic', '"'))
-        for index, url in enumerate(images):
-            yield "https://pic" + url, text.nameext_from_url(url, {
+        return [
+            ("https://pic" + url, text.nameext_from_url(url, {
                 "count": len(images),
                 "index": index,
                 "image-id": image_id,
-            })
+            }))
+            for index, url in enumerate(images)
+        ]
 
     @cache(maxage=30*24*60*60, keyarg=1)
     def login(self, username, password):
@@ -20,6 +20,7 @@ class PixivUserExtractor(Extractor):
     subcategory = "user"
     directory_fmt = ["{category}", "{artist-id}-{artist-nick}"]
     filename_fmt = "{category}_{artist-id}_{id}{num}.{extension}"
+    archive_fmt = "{id}{num}.{extension}"
     pattern = [r"(?:https?://)?(?:www\.)?pixiv\.net/member(?:_illust)?\.php\?id=(\d+)"]
     test = [("http://www.pixiv.net/member_illust.php?id=173530", {
         "url": "8f2fc0437e2095ab750c4340a4eba33ec6269477",
@@ -84,7 +85,7 @@ class PixivUserExtractor(Extractor):
             for work in data["response"]:
                 yield self.prepare_work(work)
             pinfo = data["pagination"]
-            if pinfo["current"] == pinfo["pages"]:
+            if pinfo["current"] == pinfo["pages"] or self.abort_paging():
                 return
             pagenum = pinfo["next"]
 
@@ -17,6 +17,7 @@ class SankakuTagExtractor(AsynchronousExtractor):
     subcategory = "tag"
     directory_fmt = ["{category}", "{tags}"]
     filename_fmt = "{category}_{id}_{md5}.{extension}"
+    archive_fmt = "{id}"
     pattern = [r"(?:https?://)?chan\.sankakucomplex\.com/\?tags=([^&]+)"]
     url = "https://chan.sankakucomplex.com/"
 
@@ -32,7 +33,9 @@ class SankakuTagExtractor(AsynchronousExtractor):
         yield Message.Version, 1
         yield Message.Headers, self.session.headers
         yield Message.Directory, data
-        for image in self.get_images():
+        images = self.map_parallel(
+            self.get_image_metadata, self.get_image_ids())
+        for image in images:
             image.update(data)
             yield Message.Url, image["file-url"], image
 
@@ -43,7 +46,8 @@ class SankakuTagExtractor(AsynchronousExtractor):
             "tags": self.tags,
         }
 
-    def get_images(self):
+    def get_image_ids(self):
+        """Yield the ids of all images that have not been downloaded yet"""
         params = {
             "tags": self.tags,
             "page": 1,
@@ -57,13 +61,27 @@ class SankakuTagExtractor(AsynchronousExtractor):
                     '<span class="thumb blacklisted" id=p', '>', pos)
                 if not image_id:
                     break
-                image = self.get_image_metadata(image_id)
                 count += 1
-                yield image
-            if count < 20:
+                if self.archived(image_id):
+                    self.skip()
+                    continue
+                yield image_id
+            if count < 20 or self.abort_paging():
                 return
             params["page"] += 1
 
+    def archived(self, image_id):
+        """Return True if 'image_id' is known to be in the download archive"""
+        if not self.archive:
+            return False
+        try:
+            key = self.archive.key({"id": image_id})
+        except (KeyError, IndexError, ValueError, AttributeError):
+            # the archive format needs more than the id;
+            # leave the check to the DownloadJob
+            return False
+        return key in self.archive
+
     def get_image_metadata(self, image_id):
         url = "https://chan.sankakucomplex.com/post/show/" + image_id
         page = self.request(url).text
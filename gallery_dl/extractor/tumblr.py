@@ -18,6 +18,7 @@ class TumblrUserExtractor(Extractor):
     subcategory = "user"
     directory_fmt = ["{category}", "{user}"]
     filename_fmt = "{category}_{user}_{id}{offset}.{extension}"
+    archive_fmt = "{id}{offset}"
     pattern = [r"(?:https?://)?([^.]+)\.tumblr\.com(?:/page/\d+)?/?$"]
     test = [("http://demo.tumblr.com/", {
         "url": "d3d2bb185230e537314a0036814050634c730f74",
@@ -63,7 +64,7 @@ class TumblrUserExtractor(Extractor):
                 yield data["tumblelog"]
             for post in data["posts"]:
                 yield from self.get_images_from_post(post)
-            if len(data["posts"]) < 20:
+            if len(data["posts"]) < 20 or self.abort_paging():
                 break
             params["start"] += 20
 
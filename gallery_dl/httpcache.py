@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Cache for HTTP responses of extractor requests"""
+
+import json
+import time
+import requests
+import requests.structures
+from . import config, database
+
+
+class ResponseCache():
+    """Response bodies of one category stored in an SQLite database
+
+    Cached responses younger than 'http-cache-ttl' seconds are returned
+    without any request. Older ones are revalidated with If-None-Match
+    and If-Modified-Since, so that an unchanged page only costs a
+    '304 Not Modified'. The least recently used responses are removed once
+    a category exceeds 'http-cache-size' bytes.
+    """
+
+    def __init__(self, path, category):
+        self.db, self.lock = database.connect(
+            path,
+            "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY,"
+                "category TEXT,"
+                "etag TEXT,"
+                "modified TEXT,"
+                "stored INTEGER,"
+                "used INTEGER,"
+                "size INTEGER,"
+                "headers TEXT,"
+                "content BLOB"
+            ")",
+            "CREATE INDEX IF NOT EXISTS responses_category "
+            "ON responses (category, used)",
+        )
+        self.category = category
+        self.ttl = config.interpolate(
+            ("extractor", category, "http-cache-ttl"), 0)
+        self.maxsize = config.interpolate(
+            ("extractor", category, "http-cache-size"), 64*1024*1024)
+
+    def request(self, session, url, **kwargs):
+        """Return a (possibly cached) response for a GET request of 'url'"""
+        from .extractor.common import safe_request
+        key = requests.models.PreparedRequest()
+        key.prepare_url(url, kwargs.pop("params", None))
+        key = key.url
+        now = int(time.time())
+
+        entry = self.get(key)
+        if entry and now - entry[2] < self.ttl:
+            self.touch(key, now, False)
+            return self.build_response(key, entry)
+
+        headers = dict(kwargs.pop("headers", None) or ())
+        if entry:
+            if entry[0]:
+                headers["If-None-Match"] = entry[0]
+            if entry[1]:
+                headers["If-Modified-Since"] = entry[1]
+
+        response = safe_request(session, key, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            self.touch(key, now, True)
+            return self.build_response(key, entry)
+
+        etag = response.headers.get("ETag")
+        modified = response.headers.get("Last-Modified")
+        if etag or modified or self.ttl:
+            self.put(key, etag, modified, now, response)
+        return response
+
+    def get(self, key):
+        """Return (etag, modified, stored, headers, content) for 'key'"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT etag, modified, stored, headers, content "
+                "FROM responses WHERE url=?", (key,)).fetchone()
+
+    def put(self, key, etag, modified, now, response):
+        """Store 'response' and remove old entries exceeding the size limit"""
+        content = response.content
+        # the stored body is already decoded,
+        # so its 'Content-Encoding' header does not apply anymore
+        headers = {}
+        if "Content-Type" in response.headers:
+            headers["Content-Type"] = response.headers["Content-Type"]
+        headers = json.dumps(headers)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?,?,?,?)",
+                (key, self.category, etag, modified, now, now,
+                 len(content), headers, content))
+            self.shrink()
+
+    def touch(self, key, now, revalidated):
+        """Update the usage (and validation) timestamp of 'key'"""
+        with self.lock:
+            if revalidated:
+                self.db.execute(
+                    "UPDATE responses SET stored=?, used=? WHERE url=?",
+                    (now, now, key))
+            else:
+                self.db.execute(
+                    "UPDATE responses SET used=? WHERE url=?", (now, key))
+
+    def shrink(self):
+        """Delete least recently used responses above the size limit"""
+        total = self.db.execute(
+            "SELECT SUM(size) FROM responses WHERE category=?",
+            (self.category,)).fetchone()[0] or 0
+        if total <= self.maxsize:
+            return
+        urls = []
+        for url, size in self.db.execute(
+                "SELECT url, size FROM responses WHERE category=? "
+                "ORDER BY used, rowid", (self.category,)):
+            urls.append((url,))
+            total -= size
+            if total <= self.maxsize:
+                break
+        self.db.executemany("DELETE FROM responses WHERE url=?", urls)
+
+    @staticmethod
+    def build_response(url, entry):
+        """Create a requests.Response object from a cache entry"""
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = requests.structures.CaseInsensitiveDict(
+            json.loads(entry[3]))
+        response._content = entry[4]
+        response.from_cache = True
+        return response
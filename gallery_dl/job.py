@@ -8,17 +8,37 @@
 
 import os
 import json
+import queue
 import hashlib
-from . import config, extractor, downloader, text, output, exception
+import threading
+from . import config, extractor, downloader, archive, text, output, exception
 from .extractor.message import Message
 
+def children(queue):
+    """Yield (url, extractor) for each supported URL in 'queue'
+
+    'queue' is a list of (url, kwdict) tuples as collected from
+    Message.Queue. Each kwdict is passed on as the extractor's
+    'parent_data'.
+    """
+    data = dict(queue)
+    for klass, match in extractor.classify(url for url, _ in queue):
+        extr = klass(match)
+        extr.parent_data = data[match.string]
+        yield match.string, extr
+
+
 class Job():
     """Base class for Job-types"""
 
     def __init__(self, url):
-        self.extractor = extractor.find(url)
-        if self.extractor is None:
-            raise exception.NoExtractorError(url)
+        if isinstance(url, str):
+            self.extractor = extractor.find(url)
+            if self.extractor is None:
+                raise exception.NoExtractorError(url)
+        else:
+            # an already constructed extractor object
+            self.extractor = url
 
     def run(self):
         """Execute or run the job"""
@@ -28,12 +48,17 @@ class Job():
 class DownloadJob(Job):
     """Download images into appropriate directory/filename locations"""
 
-    def __init__(self, url):
+    def __init__(self, url, concurrent=False):
         Job.__init__(self, url)
         self.directory = self.get_base_directory()
         self.downloaders = {}
         self.queue = None
-        self.printer = output.select()
+        self.pool = None
+        self.active = set()
+        self.lock = threading.Lock()
+        self.workers = config.get(("downloader", "workers"), 1)
+        self.part = config.get(("downloader", "part"), True)
+        self.printer = output.select(concurrent or self.workers > 1)
         key = ["extractor", self.extractor.category]
         if self.extractor.subcategory:
             key.append(self.extractor.subcategory)
@@ -44,54 +69,135 @@ class DownloadJob(Job):
             key + ["directory_fmt"], default=self.extractor.directory_fmt
         )
         self.directory_fmt = os.path.join(*segments)
+        self.archive = None
+        archive_path = config.interpolate(key + ["archive"])
+        if archive_path:
+            archive_fmt = config.interpolate(
+                key + ["archive_fmt"],
+                default=self.extractor.archive_fmt or self.filename_fmt
+            )
+            self.archive = archive.DownloadArchive(
+                archive_path, self.extractor.category, archive_fmt
+            )
+            self.extractor.archive = self.archive
 
     def run(self):
-        for msg in self.extractor:
-            if msg[0] == Message.Url:
-                self.download(msg)
+        try:
+            for msg in self.extractor:
+                self.dispatch(msg)
+        except BaseException:
+            if self.pool:
+                self.pool.cancel()
+            raise
+        if self.pool:
+            self.pool.join()
+        self.run_queue()
 
-            elif msg[0] == Message.Headers:
-                self.get_downloader("http:").set_headers(msg[1])
+    def dispatch(self, msg):
+        """Call the appropriate handler for the message in 'msg'"""
+        if msg[0] == Message.Url:
+            self.download(msg)
 
-            elif msg[0] == Message.Cookies:
-                self.get_downloader("http:").set_cookies(msg[1])
+        elif msg[0] == Message.Headers:
+            self.get_downloader("http:").set_headers(msg[1])
 
-            elif msg[0] == Message.Directory:
-                self.set_directory(msg)
+        elif msg[0] == Message.Cookies:
+            self.get_downloader("http:").set_cookies(msg[1])
 
-            elif msg[0] == Message.Queue:
-                self.enqueue(msg[1])
-
-            elif msg[0] == Message.Version:
-                if msg[1] != 1:
-                    raise "unsupported message-version ({}, {})".format(
-                        self.extractor.category, msg[1]
-                    )
-                # TODO: support for multiple message versions
-        self.run_queue()
+        elif msg[0] == Message.Directory:
+            self.set_directory(msg)
+
+        elif msg[0] == Message.Queue:
+            self.enqueue(msg[1], msg[2] if len(msg) > 2 else None)
+
+        elif msg[0] == Message.Version:
+            if msg[1] != 1:
+                raise "unsupported message-version ({}, {})".format(
+                    self.extractor.category, msg[1]
+                )
+            # TODO: support for multiple message versions
 
     def run_queue(self):
         """Run all jobs stored in queue"""
         if not self.queue:
             return
-        for url in self.queue:
-            try:
-                DownloadJob(url).run()
-            except exception.NoExtractorError:
-                pass
+        workers = config.interpolate(
+            ("extractor", self.extractor.category, "job-workers"), 1
+        )
+        if workers > 1:
+            JobScheduler(workers).run(self.queue)
+            return
+        for _, extr in children(self.queue):
+            DownloadJob(extr).run()
 
     def download(self, msg):
         """Download the resource specified in 'msg'"""
         _, url, metadata = msg
         filename = text.clean_path(self.filename_fmt.format(**metadata))
         path = os.path.join(self.directory, filename)
-        if os.path.exists(path):
+        archive_key = None
+        if self.archive:
+            archive_key = self.archive.key(metadata)
+            if archive_key in self.archive:
+                self.extractor.skip()
+                self.printer.skip(path)
+                return
+        with self.lock:
+            # skip files that are already being downloaded to the same path
+            busy = path in self.active
+            exists = not busy and os.path.exists(path)
+            if not busy and not exists:
+                self.active.add(path)
+        if busy or exists:
+            if exists and archive_key:
+                self.archive.add(archive_key)
+            self.extractor.skip()
             self.printer.skip(path)
             return
+        self.extractor.skip(False)
         dlinstance = self.get_downloader(url)
+        if self.pool is None and self.workers > 1:
+            self.pool = DownloadPool(self, self.workers)
+        if self.pool:
+            self.pool.put(dlinstance, url, path, archive_key)
+        else:
+            self.download_file(dlinstance, url, path, archive_key)
+
+    def download_file(self, dlinstance, url, path, archive_key=None):
+        """Download 'url' to 'path' using the downloader 'dlinstance'"""
         self.printer.start(path)
-        with open(path, "wb") as file:
-            tries = dlinstance.download(url, file)
+        try:
+            if dlinstance.resumable and self.part:
+                # write to a '.part' file and keep it around if the download
+                # fails, so that the next attempt can continue where it stopped
+                partpath = path + ".part"
+                try:
+                    file = open(partpath, "r+b")
+                    file.seek(0, os.SEEK_END)
+                except FileNotFoundError:
+                    file = open(partpath, "wb")
+                try:
+                    with file:
+                        tries = dlinstance.download(url, file, partial=True)
+                except BaseException:
+                    # keep only '.part' files with data to continue from
+                    if not os.path.getsize(partpath):
+                        os.unlink(partpath)
+                    raise
+                # only a completely downloaded file gets its final name
+                os.replace(partpath, path)
+            else:
+                with open(path, "wb") as file:
+                    tries = dlinstance.download(url, file)
+        except exception.NotFoundError:
+            # already reported by the downloader; nothing has been
+            # downloaded, so neither finish the file nor archive it
+            return
+        finally:
+            with self.lock:
+                self.active.discard(path)
+        if archive_key:
+            self.archive.add(archive_key)
         self.printer.success(path, tries)
 
     def set_directory(self, msg):
@@ -113,16 +219,16 @@ class DownloadJob(Job):
         instance = self.downloaders.get(scheme)
         if instance is None:
             klass = downloader.find(scheme)
-            instance = klass(self.printer)
+            instance = klass(self.printer, self.extractor.category)
             self.downloaders[scheme] = instance
         return instance
 
-    def enqueue(self, url):
-        """Add url to work-queue"""
+    def enqueue(self, url, kwdict=None):
+        """Add url and the metadata for its extractor to work-queue"""
         try:
-            self.queue.append(url)
+            self.queue.append((url, kwdict))
         except AttributeError:
-            self.queue = [url]
+            self.queue = [(url, kwdict)]
 
     @staticmethod
     def get_base_directory():
@@ -133,6 +239,133 @@ class DownloadJob(Job):
         return os.path.expanduser(os.path.expandvars(bdir))
 
 
+class DownloadPool():
+    """Download files of a DownloadJob with multiple worker threads"""
+
+    def __init__(self, job, workers):
+        self.job = job
+        self.error = None
+        self.cancelled = False
+        self.queue = queue.Queue(maxsize=workers*2)
+        self.threads = [
+            threading.Thread(target=self.work, daemon=True)
+            for _ in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, *task):
+        """Schedule a download; re-raise errors of previous downloads"""
+        if self.error:
+            raise self.error
+        self.queue.put(task)
+
+    def join(self):
+        """Wait until all scheduled downloads are finished"""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.error:
+            raise self.error
+
+    def cancel(self):
+        """Discard all downloads that have not been started yet"""
+        self.cancelled = True
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        for _ in self.threads:
+            self.queue.put_nowait(None)
+
+    def work(self):
+        """Worker thread: download files until a 'None' task arrives"""
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            if self.error or self.cancelled:
+                continue
+            try:
+                self.job.download_file(*task)
+            except Exception as exc:
+                self.error = exc
+
+
+class JobScheduler():
+    """Run multiple DownloadJobs concurrently
+
+    At most 'workers' jobs are running at the same time, and the number
+    of simultaneous jobs for a single category is further limited by
+    its 'job-workers' value.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.active = 0
+        self.running = {}
+        self.limits = {}
+        self.error = None
+        self.cond = threading.Condition()
+
+    def run(self, queue):
+        """Run a DownloadJob for each (url, kwdict) tuple in 'queue'"""
+        pending = [
+            DownloadJob(extr, concurrent=True)
+            for _, extr in children(queue)
+        ]
+
+        with self.cond:
+            while pending and not self.error:
+                job = self.select(pending)
+                if job:
+                    pending.remove(job)
+                    self.start(job)
+                else:
+                    self.cond.wait()
+            while self.active:
+                self.cond.wait()
+        if self.error:
+            raise self.error
+
+    def select(self, jobs):
+        """Return the first job in 'jobs' that can be started right now"""
+        if self.active >= self.workers:
+            return None
+        for job in jobs:
+            category = job.extractor.category
+            try:
+                limit = self.limits[category]
+            except KeyError:
+                limit = self.limits[category] = config.interpolate(
+                    ("extractor", category, "job-workers"), self.workers
+                )
+            if self.running.get(category, 0) < limit:
+                return job
+        return None
+
+    def start(self, job):
+        """Start 'job' in its own thread"""
+        category = job.extractor.category
+        self.running[category] = self.running.get(category, 0) + 1
+        self.active += 1
+        threading.Thread(target=self.work, args=(job,), daemon=True).start()
+
+    def work(self, job):
+        """Worker thread: run a single job and update the counters"""
+        try:
+            job.run()
+        except Exception as exc:
+            self.error = self.error or exc
+        finally:
+            with self.cond:
+                self.running[job.extractor.category] -= 1
+                self.active -= 1
+                self.cond.notify()
+
+
 class KeywordJob(Job):
     """Print available keywords"""
 
@@ -159,14 +392,14 @@ class UrlJob(Job):
     """Print download urls"""
 
     def run(self):
+        queue = []
         for msg in self.extractor:
             if msg[0] == Message.Url:
                 print(msg[1])
             elif msg[0] == Message.Queue:
-                try:
-                    UrlJob(msg[1]).run()
-                except exception.NoExtractorError:
-                    pass
+                queue.append((msg[1], msg[2] if len(msg) > 2 else None))
+        for _, extr in children(queue):
+            UrlJob(extr).run()
 
 
 
@@ -198,7 +431,7 @@ class HashJob(DownloadJob):
     def set_directory(self, msg):
         self.update_keyword(msg[1])
 
-    def enqueue(self, url):
+    def enqueue(self, url, kwdict=None):
         self.update_url(url)
 
     def update_url(self, url):
@@ -10,10 +10,21 @@ import os
 import sys
 import shutil
 import platform
+import threading
 from . import config
 
-def select():
-    """Automatically select a suitable printer class"""
+def select(concurrent=False):
+    """Automatically select a suitable printer class
+
+    If 'concurrent' is True, the returned printer can be shared by
+    multiple download threads without garbling its output.
+    """
+    printer = _select()
+    if concurrent:
+        printer = ConcurrentPrinter(printer)
+    return printer
+
+def _select():
     pdict = {
         "default": Printer,
         "pipe": Printer,
@@ -61,6 +72,29 @@ class Printer():
         pass
 
 
+class ConcurrentPrinter():
+    """Wrapper to serialize the output of a printer across threads"""
+
+    def __init__(self, printer):
+        self.printer = printer
+
+    def start(self, path):
+        # lines for unfinished downloads would get mixed up with others
+        pass
+
+    def skip(self, path):
+        with _lock:
+            self.printer.skip(path)
+
+    def success(self, path, tries):
+        with _lock:
+            self.printer.success(path, tries)
+
+    def error(self, file, error, tries, max_tries):
+        with _lock:
+            self.printer.error(file, error, tries, max_tries)
+
+
 class TerminalPrinter(Printer):
 
     def __init__(self):
@@ -113,6 +147,8 @@ class ColorPrinter(TerminalPrinter):
         print("\033[0;31m[Error]\033[0m ", error, " (", tries, "/", max_tries, ")", sep="")
 
 
+_lock = threading.Lock()
+
 if platform.system() == "Windows":
     ANSI = os.environ.get("TERM") == "ANSI"
     OFFSET = 1
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Per-host request rate limits shared by all sessions of a process"""
+
+import time
+import random
+import threading
+import urllib.parse
+from . import config
+
+
+class TokenBucket():
+    """Allow 'rate' requests per second with bursts of up to 'burst'
+
+    Callers reserve a token and sleep until it becomes available, so
+    concurrent threads get evenly spaced time slots instead of all
+    waking up at once. 'jitter' adds a random delay of up to 'jitter'
+    seconds to each request.
+    """
+
+    def __init__(self, rate, burst=1, jitter=0):
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request is allowed"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def wait(category, url):
+    """Wait until a request for 'url' is allowed for 'category'"""
+    host = urllib.parse.urlsplit(url).hostname
+    try:
+        bucket = _limiters[category, host]
+    except KeyError:
+        bucket = _get_limiter(category, host)
+    if bucket:
+        bucket.acquire()
+
+
+def set_defaults(category, rate, burst=1, jitter=0):
+    """Set the limits used for 'category' if none are configured"""
+    _defaults[category] = (rate, burst, jitter)
+
+# --------------------------------------------------------------------
+# internals
+
+_buckets = {}
+_limiters = {}
+_defaults = {}
+_lock = threading.Lock()
+
+def _get_limiter(category, host):
+    """Return the TokenBucket for requests of 'category' to 'host' or None
+
+    All categories with a configured 'rate' share one bucket per host,
+    whose limits are set by the first category using it.
+    """
+    rate, burst, jitter = _defaults.get(category, (0, 1, 0))
+    key = ("extractor", category)
+    rate = config.interpolate(key + ("rate",), rate)
+    with _lock:
+        if not rate:
+            bucket = None
+        elif host in _buckets:
+            bucket = _buckets[host]
+        else:
+            bucket = _buckets[host] = TokenBucket(
+                rate,
+                config.interpolate(key + ("burst",), burst),
+                config.interpolate(key + ("jitter",), jitter),
+            )
+        _limiters[category, host] = bucket
+    return bucket
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Retry policy for failed HTTP requests"""
+
+import time
+import random
+import email.utils
+import requests
+from . import config
+
+
+class Retry():
+    """Keep track of the retries of one request and the delays between them
+
+    Connection errors, read errors and bad status codes each have their
+    own budget ('retry-connect', 'retry-read', 'retry-status'). The delay
+    before the n-th retry of a kind is chosen randomly between 50% and
+    100% of 'retry-backoff' * 2**(n-1), but at most 'retry-backoff-max'
+    seconds. A 'Retry-After' header of a 429 or 503 response is used as
+    delay instead, unless it exceeds 'retry-after-max'. Client errors
+    other than 408 and 429 are never retried.
+
+    Each method returns the delay before the next attempt or None
+    if the caller should give up.
+    """
+
+    def __init__(self, category=None):
+        def get(key, default):
+            return config.interpolate(("extractor", category, key), default)
+        self.limits = {
+            "connect": get("retry-connect", 4),
+            "read"   : get("retry-read", 4),
+            "status" : get("retry-status", 4),
+        }
+        self.counts = dict.fromkeys(self.limits, 0)
+        self.backoff = get("retry-backoff", 1.0)
+        self.backoff_max = get("retry-backoff-max", 60.0)
+        self.after_max = get("retry-after-max", 600)
+
+    @property
+    def tries(self):
+        """Number of failed attempts so far"""
+        return sum(self.counts.values())
+
+    @property
+    def max_tries(self):
+        return sum(self.limits.values())
+
+    def connect_error(self):
+        """Return the delay before retrying a failed connection or None"""
+        if self.next("connect"):
+            return self.delay("connect")
+        return None
+
+    def read_error(self):
+        """Return the delay before retrying an interrupted read or None"""
+        if self.next("read"):
+            return self.delay("read")
+        return None
+
+    def status_error(self, response):
+        """Return the delay before repeating a request that resulted in
+        'response' or None if it should not be repeated"""
+        code = response.status_code
+        if not self.next("status") or not retryable(code):
+            return None
+        if code in (429, 503):
+            delay = retry_after(response)
+            if delay is not None:
+                return delay if delay <= self.after_max else None
+        return self.delay("status")
+
+    def next(self, kind):
+        """Count a retry of 'kind'; return False if its budget is spent"""
+        self.counts[kind] += 1
+        return self.counts[kind] <= self.limits[kind]
+
+    def delay(self, kind):
+        """Return a randomized exponential delay for the next retry"""
+        delay = min(self.backoff * 2 ** (self.counts[kind] - 1),
+                    self.backoff_max)
+        return random.uniform(delay / 2, delay)
+
+
+def retryable(code):
+    """Return True if a request failing with 'code' may succeed later"""
+    if 400 <= code < 500:
+        return code in (408, 429)
+    return code != 501
+
+
+def retry_after(response):
+    """Return the number of seconds in the 'Retry-After' header or None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+        return max(date.timestamp() - time.time(), 0)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def raise_for_status(response):
+    """Raise an HTTPError for 'response'"""
+    response.raise_for_status()
+    raise requests.exceptions.HTTPError('HTTP status "{} {}"'.format(
+        response.status_code, response.reason), response=response)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Create requests.Session objects sharing one process-wide connection pool"""
+
+import threading
+import requests
+import requests.adapters
+from . import config, ratelimit
+
+
+class Session(requests.Session):
+    """requests.Session applying the rate limits of its category"""
+
+    def __init__(self, category=None):
+        requests.Session.__init__(self)
+        self.category = category
+
+    def send(self, request, **kwargs):
+        # called for every request, including redirects
+        if self.category:
+            ratelimit.wait(self.category, request.url)
+        return requests.Session.send(self, request, **kwargs)
+
+# --------------------------------------------------------------------
+# public interface
+
+def create(category=None):
+    """Return a new requests.Session using the shared connection pool
+
+    Headers and cookies are still separate for each session object, only
+    the underlying (keep-alive) connections to each host are reused.
+    Requests are subject to the rate limits configured for 'category'.
+    """
+    session = Session(category)
+    adapter = get_adapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not config.get(("connection", "keep-alive"), True):
+        session.headers["Connection"] = "close"
+    return session
+
+def get_adapter():
+    """Return the shared transport adapter"""
+    global _adapter
+    if _adapter is None:
+        with _lock:
+            if _adapter is None:
+                _adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=config.get(
+                        ("connection", "pool-hosts"), 10),
+                    pool_maxsize=config.get(
+                        ("connection", "pool-size"), 10),
+                )
+    return _adapter
+
+# --------------------------------------------------------------------
+# internals
+
+_adapter = None
+_lock = threading.Lock()
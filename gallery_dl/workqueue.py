@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Persistent queue of input URLs and their processing state"""
+
+import os
+import hashlib
+import sqlite3
+import tempfile
+from . import config
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkQueue():
+    """URL queue stored in an SQLite database
+
+    Each URL is in one of the states 'pending', 'running', 'done' or
+    'failed'. URLs that were still 'running' when a previous process
+    got interrupted are treated as 'pending' again.
+
+    Unless 'path' or the 'queue.file' option is set, each 'source'
+    (the input file) gets its own database in the temp directory.
+    """
+
+    def __init__(self, path=None, source=None):
+        if path is None:
+            path = config.get(("queue", "file"))
+        if path is None:
+            name = ".gallery-dl.queue"
+            if source is not None:
+                if source != "-":
+                    source = os.path.abspath(os.path.expanduser(source))
+                name += "-" + hashlib.sha1(source.encode()).hexdigest()[:16]
+            path = os.path.join(tempfile.gettempdir(), name)
+        self.db = sqlite3.connect(
+            os.path.expanduser(path), timeout=30, isolation_level=None)
+        self.db.execute("CREATE TABLE IF NOT EXISTS queue ("
+                            "url TEXT PRIMARY KEY,"
+                            "state TEXT,"
+                            "error TEXT"
+                        ")")
+        self.db.execute("CREATE INDEX IF NOT EXISTS queue_state "
+                        "ON queue (state)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS info ("
+                            "key TEXT PRIMARY KEY,"
+                            "value TEXT"
+                        ")")
+        self.db.execute("UPDATE queue SET state=? WHERE state=?",
+                        (PENDING, RUNNING))
+
+    def __iter__(self):
+        """Yield pending URLs and mark them as 'running'"""
+        while True:
+            row = self.db.execute(
+                "SELECT url FROM queue WHERE state=? ORDER BY rowid LIMIT 1",
+                (PENDING,)).fetchone()
+            if not row:
+                return
+            self.set_state(row[0], RUNNING)
+            yield row[0]
+
+    def add(self, urls):
+        """Add all new URLs in 'urls' as 'pending'"""
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT OR IGNORE INTO queue (url, state) VALUES (?,?)",
+                ((url, PENDING) for url in urls))
+
+    def load(self, urls):
+        """Continue an earlier run with the same 'urls' or start over
+
+        The queue is only resumed if it was filled with exactly the same
+        list of URLs. Otherwise, for example with a different input on
+        stdin or an edited input file, all old entries get discarded.
+        """
+        urls = list(urls)
+        digest = hashlib.sha1("\n".join(urls).encode()).hexdigest()
+        row = self.db.execute(
+            "SELECT value FROM info WHERE key='urls'").fetchone()
+        if not row or row[0] != digest:
+            with self.db:
+                self.db.execute("BEGIN")
+                self.db.execute("DELETE FROM queue")
+                self.db.execute(
+                    "INSERT OR REPLACE INTO info VALUES ('urls', ?)",
+                    (digest,))
+        self.add(urls)
+
+    def done(self, url):
+        """Mark 'url' as successfully processed"""
+        self.set_state(url, DONE)
+
+    def failed(self, url, error=None):
+        """Mark 'url' as failed"""
+        self.set_state(url, FAILED, error)
+
+    def set_state(self, url, state, error=None):
+        self.db.execute("UPDATE queue SET state=?, error=? WHERE url=?",
+                        (state, error, url))
+
+    def clear(self):
+        """Remove all URLs, so that a later run starts from scratch"""
+        self.db.execute("DELETE FROM queue")
+
+    def count(self, state):
+        """Return the number of URLs in 'state'"""
+        return self.db.execute(
+            "SELECT COUNT(*) FROM queue WHERE state=?", (state,)).fetchone()[0]
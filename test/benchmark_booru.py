@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Measure time and peak memory for parsing large booru API pages
+
+'full' emulates the previous behavior (decode the whole response into
+'.text', then json.loads or ET.fromstring), 'stream' uses the current
+incremental parsers on the raw byte stream. Pages are served gzipped
+by a separate process.
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+import subprocess
+import xml.etree.ElementTree as ET
+import json
+from gallery_dl.extractor import booru
+
+SERVER = """
+import sys, gzip, json, http.server
+from xml.sax.saxutils import quoteattr
+count = int(sys.argv[1])
+posts = [{
+    "id": i, "md5": "%032x" % i, "score": i % 97, "rating": "s",
+    "tags": " ".join("tag_%d_ä" % (i * t % 5003) for t in range(60)),
+    "file_url": "https://example.org/data/%032x.jpg" % i,
+    "source": "https://example.org/source/%d" % i,
+    "width": 1200, "height": 1600, "parent_id": None,
+} for i in range(count)]
+pages = {
+    "/json": json.dumps(posts, ensure_ascii=False).encode(),
+    "/xml": ('<?xml version="1.0" encoding="UTF-8"?><posts>' + "".join(
+        "<post " + " ".join("%s=%s" % (k, quoteattr(str(v)))
+                            for k, v in p.items()) + "/>"
+        for p in posts) + "</posts>").encode(),
+}
+pages = {path: (len(data), gzip.compress(data, 1))
+         for path, data in pages.items()}
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def do_GET(self):
+        size, data = pages[self.path.partition("?")[0]]
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Size", str(size))
+        self.end_headers()
+        self.wfile.write(data)
+    def log_message(self, *args):
+        pass
+server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+class FullJSON(booru.JSONBooruExtractor):
+    def request_page(self, params):
+        return json.loads(self.request(self.api_url, params=params).text)
+
+
+class FullXML(booru.XMLBooruExtractor):
+    def request_page(self, params):
+        root = ET.fromstring(self.request(self.api_url, params=params).text)
+        return [item.attrib for item in root]
+
+
+class StreamJSON(booru.JSONBooruExtractor):
+    pass
+
+
+class StreamXML(booru.XMLBooruExtractor):
+    pass
+
+
+def measure(cls, url, rounds):
+    extr = cls()
+    extr.api_url = url
+    extr.request_page({})  # warm up connection and caches
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        posts = extr.request_page({})
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    del posts
+    tracemalloc.start()
+    extr.request_page({})
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(args.posts)],
+                              stdout=subprocess.PIPE)
+    try:
+        port = server.stdout.readline().decode().strip()
+        base = "http://127.0.0.1:{}/".format(port)
+        print("{:<8} {:>10} {:>12} {:>12}".format(
+            "format", "page MiB", "full", "stream"))
+        for fmt, full, stream in (("json", FullJSON, StreamJSON),
+                                  ("xml", FullXML, StreamXML)):
+            url = base + fmt
+            size = int(FullJSON().request(url).headers["X-Size"]) / 1024**2
+            results = [measure(cls, url, args.rounds)
+                       for cls in (full, stream)]
+            print("{:<8} {:>10.1f} {:>10.1f}ms {:>10.1f}ms".format(
+                fmt, size, *(r[0] * 1000 for r in results)))
+            print("{:<8} {:>10} {:>10.1f}MB {:>10.1f}MB".format(
+                "  peak", "", *(r[1] / 1024**2 for r in results)))
+            sys.stdout.flush()
+    finally:
+        server.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Measure cache database throughput with many processes sharing one file
+
+'exclusive' emulates the previous lookup strategy (BEGIN EXCLUSIVE for
+every read, rollback journal), 'wal' uses the current DatabaseCache.
+"""
+
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from gallery_dl import cache, config
+
+
+class ExclusiveCache():
+    """Previous lookup and write behavior of DatabaseCache"""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, timeout=30)
+
+    def __getitem__(self, key):
+        key, timestamp = key
+        cursor = self.db.cursor()
+        cursor.execute("BEGIN EXCLUSIVE")
+        cursor.execute("SELECT value, expires FROM data WHERE key=?", (key,))
+        value, expires = cursor.fetchone()
+        self.db.commit()
+        return pickle.loads(value), expires
+
+    def __setitem__(self, key, item):
+        value, expires = item
+        self.db.execute("INSERT OR REPLACE INTO data VALUES (?,?,?)",
+                        (key, pickle.dumps(value), expires))
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        self.db.commit()
+
+
+def open_cache(mode, path):
+    if mode == "exclusive":
+        return ExclusiveCache(path)
+    config.set(("cache", "file"), path)
+    return cache.DatabaseCache()
+
+
+def worker(mode, path, ops, write_every, start):
+    dbcache = open_cache(mode, path)
+    value = {"session": "x" * 200}
+    latencies = []
+    start.wait()
+    for num in range(ops):
+        before = time.perf_counter()
+        if write_every and num % write_every == 0:
+            with dbcache:
+                dbcache["key-%d" % (num % 50)] = (value, 2**40)
+        else:
+            dbcache["key-0", 0]
+        latencies.append(time.perf_counter() - before)
+    return latencies
+
+
+def run(mode, processes, ops, write_every):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "cache")
+        dbcache = open_cache(mode, path)
+        if mode == "exclusive":
+            dbcache.db.execute("CREATE TABLE data "
+                               "(key TEXT PRIMARY KEY, value TEXT, "
+                               "expires INTEGER)")
+        else:
+            dbcache.connect()
+        with dbcache:
+            dbcache["key-0"] = ({"session": "x" * 200}, 2**40)
+
+        manager = multiprocessing.Manager()
+        start = manager.Event()
+        with multiprocessing.Pool(processes) as pool:
+            results = [
+                pool.apply_async(worker, (mode, path, ops, write_every, start))
+                for _ in range(processes)
+            ]
+            time.sleep(0.5)
+            begin = time.perf_counter()
+            start.set()
+            latencies = sorted(l for r in results for l in r.get())
+            duration = time.perf_counter() - begin
+    return (len(latencies) / duration,
+            latencies[int(len(latencies) * 0.99)] * 1000,
+            latencies[-1] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--processes", type=int, default=32)
+    parser.add_argument("-n", "--ops", type=int, default=500,
+                        help="cache operations per process")
+    parser.add_argument("-w", "--write-every", type=int, default=50,
+                        help="make every N-th operation a write (0: never)")
+    parser.add_argument("modes", nargs="*", default=["exclusive", "wal"])
+    args = parser.parse_args()
+
+    print("{:<10} {:>10} {:>10} {:>10}".format(
+        "mode", "ops/s", "p99 ms", "max ms"))
+    for mode in args.modes:
+        print("{:<10} {:>10.0f} {:>10.2f} {:>10.2f}".format(
+            mode, *run(mode, args.processes, args.ops, args.write_every)))
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Measure client CPU time per GB for the http downloader's write paths
+
+The server runs in a separate process, so only the time spent by the
+downloading side is counted.
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from gallery_dl import config, output
+from gallery_dl.downloader import http
+
+SERVER = """
+import sys, http.server
+size = int(sys.argv[1])
+data = bytes(1024*1024)
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        left = size
+        while left:
+            left -= self.wfile.write(data[:min(left, len(data))])
+    def log_message(self, *args):
+        pass
+server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def iter_content(dl, response, file):
+    for data in response.iter_content(dl.chunk_size):
+        file.write(data)
+
+
+def readinto(dl, response, file):
+    dl.receive(response, file)
+
+
+def measure(url, func, chunk_size, size, rounds):
+    config.set(("downloader", "chunk-size"), chunk_size)
+    dl = http.Downloader(output.Printer())
+    best = None
+    with open(os.devnull, "wb") as file:
+        for _ in range(rounds):
+            start = time.process_time()
+            response = dl.session.get(url, stream=True)
+            func(dl, response, file)
+            cpu = time.process_time() - start
+            best = cpu if best is None else min(best, cpu)
+    return best * 1024**3 / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=512, metavar="MiB")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--chunk-sizes", default="16384,65536,262144,1048576")
+    args = parser.parse_args()
+    size = args.size * 1024 * 1024
+
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(size)],
+                              stdout=subprocess.PIPE)
+    try:
+        port = server.stdout.readline().decode().strip()
+        url = "http://127.0.0.1:{}/".format(port)
+        print("{:>10}  {:>14}  {:>14}".format(
+            "chunk-size", "iter_content", "readinto"))
+        for chunk_size in map(int, args.chunk_sizes.split(",")):
+            print("{:>10}  {:>10.3f} s/GB  {:>10.3f} s/GB".format(
+                chunk_size,
+                measure(url, iter_content, chunk_size, size, args.rounds),
+                measure(url, readinto, chunk_size, size, args.rounds),
+            ))
+    finally:
+        server.kill()
+
+
+if __name__ == "__main__":
+    main()
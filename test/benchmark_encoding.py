@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Measure the time to get '.text' from extractor responses
+
+'detect' is the previous behavior (encoding set to None, so 'requests'
+runs charset detection over the whole body), 'resolve' uses
+resolve_encoding(). Saved pages can be given as arguments; otherwise
+synthetic listing pages are used.
+"""
+
+import time
+import argparse
+import requests
+from gallery_dl.extractor.common import resolve_encoding
+
+
+def synthetic_pages(size):
+    row = ('<li class="thumb"><a href="/post/{0}" title="タグ {0} – café">'
+           '<img src="//img.example.org/thumb/{0:032x}.jpg"></a></li>\n')
+    body = "".join(row.format(i) for i in range(size // len(row)))
+    return [
+        ("header", "text/html; charset=UTF-8",
+         "<html><head><title>List</title></head><body>" + body, "utf-8"),
+        ("meta", "text/html",
+         '<html><head><meta charset="utf-8"><title>List</title></head>'
+         "<body>" + body, "utf-8"),
+        ("meta-sjis", "text/html",
+         '<html><head><meta http-equiv="Content-Type" '
+         'content="text/html; charset=Shift_JIS"></head><body>' +
+         body.replace("–", "-").replace("é", "e"), "shift_jis"),
+    ]
+
+
+def saved_pages(paths):
+    for path in paths:
+        with open(path, "rb") as file:
+            yield path, "text/html", file.read()
+
+
+def make_response(content, ctype):
+    response = requests.Response()
+    response._content = content
+    response.headers["Content-Type"] = ctype
+    return response
+
+
+def measure(content, ctype, resolve, rounds):
+    best = None
+    for _ in range(rounds):
+        response = make_response(content, ctype)
+        start = time.perf_counter()
+        response.encoding = resolve_encoding(response) if resolve else None
+        response.text
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best * 1000, response.encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=2048, metavar="KiB")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("pages", nargs="*", metavar="FILE")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = list(saved_pages(args.pages))
+    else:
+        pages = [
+            (name, ctype, text.encode(encoding))
+            for name, ctype, text, encoding in
+            synthetic_pages(args.size * 1024)
+        ]
+
+    print("{:<16} {:>8} {:>22} {:>22}".format(
+        "page", "KiB", "detect", "resolve"))
+    for name, ctype, content in pages:
+        results = [measure(content, ctype, resolve, args.rounds)
+                   for resolve in (False, True)]
+        print("{:<16} {:>8} {:>10.1f}ms {:>9} {:>10.1f}ms {:>9}".format(
+            name[-16:], len(content) // 1024,
+            results[0][0], str(results[0][1])[:9],
+            results[1][0], str(results[1][1])[:9]))
+
+
+if __name__ == "__main__":
+    main()
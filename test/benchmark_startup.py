@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Measure the startup cost of short-lived gallery-dl invocations
+
+Each case runs in a fresh interpreter with a cache file in an empty
+temporary directory. A case fails if it exceeds '--max' seconds or if it
+creates the cache database although it never needed it.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+CASES = [
+    # name, gallery-dl arguments (None: only import), rebuild manifest
+    ("import gallery_dl", None, False),
+    ("--version", ["--version"], False),
+    ("--list-modules", ["--list-modules"], False),
+    ("--list-extractors", ["--list-extractors"], False),
+    ("-g (unsupported URL)", ["-g", "nonexistent:url"], False),
+    ("rebuild manifest", ["--list-extractors"], True),
+]
+
+CODE = """
+import sys
+import gallery_dl
+if len(sys.argv) > 1:
+    try:
+        gallery_dl.main()
+    except SystemExit:
+        pass
+"""
+
+
+def run(args, tmpdir, rebuild):
+    manifest = os.path.join(tmpdir, "manifest")
+    if rebuild and os.path.exists(manifest):
+        os.unlink(manifest)
+    argv = [sys.executable, "-c", CODE]
+    if args is not None:
+        argv += ["-o", "cache.file=" + os.path.join(tmpdir, "cache"),
+                 "-o", "cache.manifest=" + manifest] + args
+    start = time.perf_counter()
+    subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--max", type=float, metavar="SECONDS")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cachefile = os.path.join(tmpdir, "cache")
+        for name, case, rebuild in CASES:
+            best = min(run(case, tmpdir, rebuild) for _ in range(args.rounds))
+            status = ""
+            if os.path.exists(cachefile):
+                status = "  FAIL: cache database was created"
+                os.unlink(cachefile)
+            elif args.max and best > args.max:
+                status = "  FAIL: slower than {} s".format(args.max)
+            failed = failed or bool(status)
+            print("{:<24} {:>8.1f} ms{}".format(name, best * 1000, status))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
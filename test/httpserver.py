@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+"""Local HTTP server for tests of jobs and downloaders"""
+
+import re
+import gzip
+import time
+import threading
+import http.server
+
+
+class Resource():
+    """Content and behavior of one URL path
+
+    'delay' seconds pass before each response; 'ranges' enables
+    support for Range requests; 'cut' closes the connection after that
+    many bytes of the body for the next 'cuts' requests; 'compress'
+    sends the body gzipped; 'status' replaces a successful status;
+    'errors' maps Range header values to the status code to answer them
+    with, where 200 ignores the range.
+    """
+
+    def __init__(self, content=b"", status=None, delay=0, ranges=True,
+                 cut=None, cuts=0, compress=False, errors=None):
+        self.content = content
+        self.status = status
+        self.delay = delay
+        self.ranges = ranges
+        self.cut = cut
+        self.cuts = cuts
+        self.compress = compress
+        self.errors = errors or {}
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.partition("?")[0]
+        with server.lock:
+            server.requests.append((path, dict(self.headers)))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            self.respond(server.resources.get(path))
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def respond(self, res):
+        if res is None:
+            return self.send(404, b"")
+        if res.delay:
+            time.sleep(res.delay)
+        if res.status:
+            return self.send(res.status, b"")
+
+        content = res.content
+        headers = {}
+        status = 200
+        crange = self.headers.get("Range", "")
+        if crange in res.errors:
+            if res.errors[crange] != 200:
+                return self.send(res.errors[crange], b"")
+            crange = ""
+        match = re.match(r"bytes=(\d+)-(\d*)", crange)
+        if res.ranges:
+            headers["Accept-Ranges"] = "bytes"
+            if match:
+                begin = int(match.group(1))
+                end = int(match.group(2)) + 1 if match.group(2) else None
+                if begin >= len(content):
+                    headers["Content-Range"] = "bytes */{}".format(
+                        len(content))
+                    return self.send(416, b"", headers)
+                part = content[begin:end]
+                headers["Content-Range"] = "bytes {}-{}/{}".format(
+                    begin, begin + len(part) - 1, len(content))
+                content = part
+                status = 206
+        if res.compress:
+            headers["Content-Encoding"] = "gzip"
+            content = gzip.compress(content)
+
+        cut = None
+        with self.server.lock:
+            if res.cuts:
+                res.cuts -= 1
+                cut = res.cut
+        self.send(status, content, headers, cut)
+
+    def send(self, status, content, headers=(), cut=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        if cut is not None:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        if cut is not None:
+            self.wfile.write(content[:cut])
+            self.wfile.flush()
+            self.close_connection = True
+        else:
+            self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(http.server.ThreadingHTTPServer):
+    """HTTP server on 127.0.0.1 running in a background thread"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        http.server.ThreadingHTTPServer.__init__(
+            self, ("127.0.0.1", 0), Handler)
+        self.resources = {}
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(
+            target=self.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def add(self, path, content=b"", **options):
+        """Serve 'content' at 'path' and return its URL"""
+        self.resources[path] = Resource(content, **options)
+        return self.url(path)
+
+    def url(self, path):
+        return "http://127.0.0.1:{}{}".format(self.server_port, path)
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
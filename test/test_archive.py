@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import unittest
+import gallery_dl.archive as archive
+
+class TestDownloadArchive(unittest.TestCase):
+
+    def test_archive(self):
+        arch = archive.DownloadArchive(":memory:", "booru", "{id}")
+        key = arch.key({"id": 12345, "md5": "abc"})
+        self.assertEqual(key, "booru12345")
+        self.assertNotIn(key, arch)
+        arch.add(key)
+        arch.add(key)
+        self.assertIn(key, arch)
+        self.assertNotIn(arch.key({"id": 1234}), arch)
+
+    def test_shared_connection(self):
+        arch1 = archive.DownloadArchive(":memory:", "a", "{id}")
+        arch2 = archive.DownloadArchive(":memory:", "b", "{id}")
+        arch1.add(arch1.key({"id": 1}))
+        self.assertIn("a1", arch2)
+        self.assertNotIn(arch2.key({"id": 1}), arch2)
+
+if __name__ == '__main__':
+    unittest.main()
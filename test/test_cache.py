@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import os
+import sqlite3
+import tempfile
+import unittest
+import gallery_dl.config as config
+import gallery_dl.cache as cache
+
+class TestMemoryCache(unittest.TestCase):
+
+    def tearDown(self):
+        config.clear()
+
+    def test_entry_limit(self):
+        config.set(("cache", "memory-entries"), 2)
+        memcache = cache.MemoryCache()
+        memcache["a"] = (1, 100)
+        memcache["b"] = (2, 100)
+        memcache["a", 0]
+        memcache["c"] = (3, 100)
+        self.assertEqual(list(memcache.cache), ["a", "c"])
+        with self.assertRaises(cache.CacheInvalidError):
+            memcache["b", 0]
+
+    def test_size_limit(self):
+        config.set(("cache", "memory-size"), 250)
+        memcache = cache.MemoryCache()
+        memcache["a"] = ("x" * 100, 100)
+        memcache["b"] = ("x" * 100, 100)
+        memcache["c"] = ("x" * 100, 100)
+        self.assertEqual(list(memcache.cache), ["b", "c"])
+        self.assertLessEqual(memcache.size, 250)
+        memcache["c"] = ("x", 100)
+        memcache["d"] = ("x" * 100, 100)
+        self.assertEqual(list(memcache.cache), ["b", "c", "d"])
+
+
+class TestDatabaseCache(unittest.TestCase):
+
+    def tearDown(self):
+        config.clear()
+
+    def test_lazy(self):
+        dbcache = cache.DatabaseCache()
+        config.set(("cache", "file"), ":memory:")
+        self.assertIsNone(dbcache.db)
+        with dbcache:
+            with self.assertRaises(cache.CacheInvalidError):
+                dbcache["key", 0]
+            self.assertIsNotNone(dbcache.db)
+            dbcache["key"] = ("value", 100)
+        self.assertEqual(dbcache["key", 50], ("value", 100))
+        with self.assertRaises(cache.CacheInvalidError):
+            dbcache["key", 150]
+
+    def test_disabled(self):
+        dbcache = cache.DatabaseCache()
+        config.set(("cache", "file"), None)
+        dbcache["key"] = ("value", 100)
+        with self.assertRaises(cache.CacheInvalidError):
+            dbcache["key", 50]
+        self.assertIsNone(dbcache.db)
+
+    def test_batched_writes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cache")
+            config.set(("cache", "file"), path)
+            dbcache = cache.DatabaseCache()
+            dbcache.connect()
+            with dbcache:
+                with dbcache:
+                    dbcache["a"] = (1, 100)
+                dbcache["b"] = (2, 100)
+                self.assertEqual(dbcache["a", 50], (1, 100))
+                self.assertEqual(self.rows(path), [])
+            self.assertEqual(self.rows(path), [("a", 100), ("b", 100)])
+            mode = dbcache.db.execute("PRAGMA journal_mode").fetchone()[0]
+            self.assertEqual(mode, "wal")
+            dbcache.db.close()
+
+    def test_purge_and_stats(self):
+        config.set(("cache", "file"), ":memory:")
+        dbcache = cache.DatabaseCache()
+        dbcache["mod.func-1"] = ("abc", 100)
+        dbcache["mod.func-2"] = ("abc", 200)
+        dbcache["mod.other"] = ("abc", 300)
+        self.assertEqual(dbcache.purge(150), 1)
+        dbcache.add_stats({"mod.func": [3, 1]})
+        dbcache.add_stats({"mod.func": [1, 1], "mod.gone": [0, 2]})
+        size = len(cache.pickle.dumps("abc"))
+        self.assertEqual(dbcache.stats(), [
+            ("mod.func", 1, size, 4, 2),
+            ("mod.gone", 0, 0, 0, 2),
+            ("mod.other", 1, size, 0, 0),
+        ])
+
+    @staticmethod
+    def rows(path):
+        db = sqlite3.connect(path)
+        try:
+            return db.execute(
+                "SELECT key, expires FROM data ORDER BY key").fetchall()
+        finally:
+            db.close()
+
+    def test_decorator(self):
+        config.set(("cache", "file"), ":memory:")
+        decorator = cache.build_cache_decorator(
+            cache.MemoryCache(), cache.DatabaseCache())
+        calls = []
+
+        @decorator(keyarg=0)
+        def func(value):
+            calls.append(value)
+            return value * 2
+
+        self.assertEqual(func(1), 2)
+        self.assertEqual(func(1), 2)
+        self.assertEqual(func(2), 4)
+        self.assertEqual(calls, [1, 2])
+
+    def test_decorator_chain(self):
+        # 'with' blocks of a CacheChain have to reach the DatabaseCache
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cache")
+            config.set(("cache", "file"), path)
+            dbcache = cache.DatabaseCache()
+            decorator = cache.build_cache_decorator(
+                cache.MemoryCache(), dbcache)
+
+            @decorator(maxage=100, keyarg=0)
+            def func(value):
+                return value * 2
+
+            self.assertEqual(func(1), 2)
+            self.assertEqual(dbcache.depth, 0)
+            self.assertEqual(len(self.rows(path)), 1)
+
+            with func.cache:
+                self.assertEqual(func(2), 4)
+                self.assertEqual(func(3), 6)
+                self.assertEqual(dbcache.depth, 1)
+                self.assertEqual(len(self.rows(path)), 1)
+            self.assertEqual(dbcache.depth, 0)
+            self.assertEqual(len(self.rows(path)), 3)
+            dbcache.db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import io
+import os
+import sys
+import time
+import errno
+import tempfile
+import threading
+import subprocess
+import unittest
+import unittest.mock
+import requests
+from gallery_dl import config, output
+from gallery_dl.downloader import http
+from .httpserver import Server
+
+
+class DownloaderTestCase(unittest.TestCase):
+
+    content = bytes(range(256)) * 400
+
+    def setUp(self):
+        self.server = Server()
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "file.bin")
+        config.set(("extractor", "retry-backoff"), 0.001)
+
+    def tearDown(self):
+        config.clear()
+        self.server.close()
+        self.dir.cleanup()
+
+    def download(self, url, data=b""):
+        """Download 'url' into a file already containing 'data'"""
+        with open(self.path, "wb") as file:
+            file.write(data)
+        with open(self.path, "r+b") as file:
+            file.seek(0, os.SEEK_END)
+            http.Downloader(output.Printer()).download(url, file, True)
+        with open(self.path, "rb") as file:
+            return file.read()
+
+    def ranges(self):
+        return [headers.get("Range") for _, headers in self.server.requests]
+
+
+class TestResume(DownloaderTestCase):
+
+    def test_resume(self):
+        url = self.server.add("/f.bin", self.content)
+        self.assertEqual(self.download(url, self.content[:1000]),
+                         self.content)
+        self.assertEqual(self.ranges(), ["bytes=1000-"])
+        self.assertEqual(self.server.requests[0][1]["Accept-Encoding"],
+                         "identity")
+
+    def test_complete(self):
+        url = self.server.add("/f.bin", self.content)
+        self.assertEqual(self.download(url, self.content), self.content)
+        self.assertEqual(self.ranges(), ["bytes={}-".format(
+            len(self.content))])
+
+    def test_longer_than_resource(self):
+        # a '416' for data that does not match the resource's size
+        url = self.server.add("/f.bin", self.content[:100])
+        self.assertEqual(self.download(url, b"x" * 200), self.content[:100])
+        self.assertEqual(self.ranges(), ["bytes=200-", None])
+
+    def test_range_ignored(self):
+        url = self.server.add("/f.bin", self.content, ranges=False)
+        self.assertEqual(self.download(url, b"wrong data"), self.content)
+
+    def test_connection_lost(self):
+        url = self.server.add("/f.bin", self.content, cut=5000, cuts=2)
+        self.assertEqual(self.download(url), self.content)
+        self.assertEqual(self.ranges(), [None, "bytes=5000-", "bytes=10000-"])
+
+    def test_compressed(self):
+        # a compressed response can not continue uncompressed data
+        url = self.server.add("/f.bin", self.content, compress=True)
+        self.assertEqual(self.download(url, self.content[:1000]),
+                         self.content)
+        self.assertEqual(self.ranges(), ["bytes=1000-", None])
+
+    def test_write_error(self):
+        # errors of the output file are not connection errors to retry
+        class FullDisk():
+            def write(self, data):
+                raise OSError(errno.ENOSPC, "No space left on device")
+
+        url = self.server.add("/f.bin", self.content)
+        for fast in (True, False):
+            del self.server.requests[:]
+            with unittest.mock.patch.object(http, "_HTTPLIB_FP", fast), \
+                    self.assertRaises(OSError) as cm:
+                http.Downloader(output.Printer()).download(url, FullDisk())
+            self.assertEqual(cm.exception.errno, errno.ENOSPC)
+            self.assertNotIsInstance(cm.exception,
+                                     requests.exceptions.RequestException)
+            self.assertEqual(len(self.server.requests), 1)
+
+    def test_generic_receive(self):
+        # without access to the http.client response
+        url = self.server.add("/f.bin", self.content)
+        with unittest.mock.patch.object(http, "_HTTPLIB_FP", False):
+            self.assertEqual(self.download(url, self.content[:1000]),
+                             self.content)
+
+
+class TestPreallocate(DownloaderTestCase):
+
+    def setUp(self):
+        DownloaderTestCase.setUp(self)
+        config.set(("downloader", "preallocate"), True)
+        config.set(("downloader", "chunk-size"), 1000)
+
+    def test_preallocate(self):
+        url = self.server.add("/f.bin", self.content, cut=5000, cuts=1)
+        with unittest.mock.patch.object(
+                http.Downloader, "allocate",
+                wraps=http.Downloader.allocate) as allocate:
+            with open(self.path, "wb") as file:
+                http.Downloader(output.Printer()).download(url, file)
+            self.assertEqual(allocate.call_count, 2)
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_partial(self):
+        # the size of a '.part' file has to match its data at all times
+        url = self.server.add("/f.bin", self.content)
+        with unittest.mock.patch.object(http.Downloader, "allocate") as alloc:
+            self.assertEqual(self.download(url), self.content)
+            alloc.assert_not_called()
+
+    def test_interrupted(self):
+        class Interrupt(io.FileIO):
+            def write(self, data):
+                if self.tell() >= 3000:
+                    raise KeyboardInterrupt()
+                return io.FileIO.write(self, data)
+
+        url = self.server.add("/f.bin", self.content)
+        with Interrupt(self.path, "w") as file:
+            # without the file removal of download()
+            with self.assertRaises(KeyboardInterrupt):
+                http.Downloader(output.Printer()).download_impl(url, file)
+            self.assertEqual(os.path.getsize(self.path), 3000)
+
+
+class TestSegments(DownloaderTestCase):
+
+    def setUp(self):
+        DownloaderTestCase.setUp(self)
+        config.set(("downloader", "segments"), 4)
+        config.set(("downloader", "segment-threshold"), 1000)
+        self.segments = ["bytes=0-25599", "bytes=25600-51199",
+                         "bytes=51200-76799", "bytes=76800-102399"]
+
+    def test_segments(self):
+        url = self.server.add("/f.bin", self.content)
+        self.assertEqual(self.download(url), self.content)
+        ranges = self.ranges()
+        self.assertEqual(ranges[0], None)
+        self.assertEqual(sorted(ranges[1:]), self.segments)
+
+    def test_resume(self):
+        url = self.server.add("/f.bin", self.content)
+        self.assertEqual(self.download(url, self.content[:2000]),
+                         self.content)
+        self.assertEqual(sorted(self.ranges()), [
+            "bytes=2000-", "bytes=2000-27099", "bytes=27100-52199",
+            "bytes=52200-77299", "bytes=77300-102399"])
+
+    def test_failed_segment(self):
+        url = self.server.add("/f.bin", self.content,
+                              errors={self.segments[2]: 403})
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.download(url)
+        # only the data up to the failed segment is kept
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), self.content[:51200])
+
+    def test_range_ignored(self):
+        url = self.server.add("/f.bin", self.content,
+                              errors={self.segments[1]: 200})
+        self.assertEqual(self.download(url), self.content)
+        # the rest gets downloaded over a single connection
+        ranges = self.ranges()
+        self.assertEqual(len(ranges), 6)
+        self.assertEqual(ranges[-1], "bytes=25600-")
+
+    def test_killed(self):
+        # a process killed while its segments are still being downloaded
+        # leaves a file of full size, most of which is not valid data
+        url = self.server.add("/f.bin", self.content, delay=0.5)
+        with open(self.path, "wb") as file:
+            file.write(self.content[:2000])
+        script = (
+            "import sys\n"
+            "from gallery_dl import config, output\n"
+            "from gallery_dl.downloader import http\n"
+            "config.set(('downloader', 'segments'), 4)\n"
+            "config.set(('downloader', 'segment-threshold'), 1000)\n"
+            "with open(sys.argv[2], 'r+b') as file:\n"
+            "    file.seek(0, 2)\n"
+            "    http.Downloader(output.Printer()).download("
+            "sys.argv[1], file, True)\n"
+        )
+        process = subprocess.Popen(
+            [sys.executable, "-c", script, url, self.path],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(500):
+                if os.path.getsize(self.path) == len(self.content):
+                    break
+                time.sleep(0.01)
+            else:
+                self.fail("segmented download did not start")
+        finally:
+            process.kill()
+            process.wait()
+
+        self.server.resources["/f.bin"].delay = 0
+        del self.server.requests[:]
+        with open(self.path, "r+b") as file:
+            file.seek(0, os.SEEK_END)
+            http.Downloader(output.Printer()).download(url, file, True)
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertEqual(self.ranges()[0], "bytes=2000-")
+        self.assertFalse(os.path.exists(self.path + ".seg"))
+
+    def test_interrupted(self):
+        # Ctrl+C keeps the contiguous part and removes the marker
+        url = self.server.add("/f.bin", self.content, delay=0.2)
+        downloader = http.Downloader(output.Printer())
+        join = threading.Thread.join
+
+        def interrupt(thread, timeout=None):
+            if timeout is None:
+                raise KeyboardInterrupt()
+            return join(thread, timeout)
+
+        with unittest.mock.patch.object(threading.Thread, "join", interrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                with open(self.path, "wb") as file:
+                    downloader.download(url, file, True)
+        self.assertFalse(os.path.exists(self.path + ".seg"))
+        self.assertLess(os.path.getsize(self.path), len(self.content))
+
+    def test_threshold(self):
+        config.set(("downloader", "segment-threshold"), len(self.content) + 1)
+        url = self.server.add("/f.bin", self.content)
+        self.assertEqual(self.download(url), self.content)
+        self.assertEqual(self.ranges(), [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import os
+import re
+import sys
+import io
+import json
+import heapq
+import time
+import tempfile
+import threading
+import itertools
+import requests
+import unittest
+import subprocess
+from gallery_dl import extractor, config, job
+from gallery_dl.extractor.common import ordered_map, resolve_encoding
+from gallery_dl.extractor import booru
+
+
+def linear(url):
+    for pattern, klass in extractor._list_patterns():
+        if pattern.match(url):
+            return klass
+    return None
+
+def candidates(url):
+    """Return all (position, pattern, info) tuples that might match 'url'"""
+    keys = extractor._lookup_keys(url)
+    return heapq.merge(*[extractor._index[key] for key in keys])
+
+def indexed(url):
+    for _, pattern, info in candidates(url):
+        if re.match(pattern, url):
+            return extractor._get_class(info)
+    return None
+
+
+class TestIndex(unittest.TestCase):
+
+    def test_keys(self):
+        key = extractor._pattern_key
+        self.assertEqual(key(r"(?:https?://)?(?:www\.)?pixiv\.net/(\d+)"),
+                         "pixiv.net")
+        self.assertEqual(key(r"(?:https?://)?i\d+\.pixiv\.net(?:/.*)?"),
+                         "pixiv.net")
+        self.assertEqual(key(r"(?:https?://)?([^.]+)\.tumblr\.com/?$"),
+                         "tumblr.com")
+        self.assertEqual(key(r"(?:https?://)?(g\.e-|ex)hentai\.org/g/"),
+                         "org")
+        self.assertEqual(key(r"(?:https?://)?read(?:er)?\.pm\.org/read/"),
+                         "pm.org")
+        self.assertEqual(key(r"(?:https?://)?[^/]+/img-(\d+)"), None)
+        self.assertEqual(key(r"generic:(.+)"), "generic:")
+        self.assertEqual(key(r"(?:https?://)?.+\.example\.com/"), None)
+        self.assertEqual(key(r"(\w+)\.com/(\d+)"), None)
+
+    def test_candidates(self):
+        infos = [info for _, _, info in candidates(
+            "https://www.pixiv.net/member.php?id=1")]
+        self.assertTrue(infos)
+        for info in infos:
+            self.assertEqual(info["category"], "pixiv")
+
+    def test_consistency(self):
+        urls = ["", "generic:", "example.org", "https://example.org/"]
+        for klass in extractor.extractors():
+            for url, _ in getattr(klass, "test", ()):
+                urls.append(url)
+                urls.append("generic:" + url)
+                if url.startswith("https://"):
+                    urls.append(url[8:])
+                    urls.append("http://" + url[8:])
+                if url.startswith("http://"):
+                    urls.append(url[7:])
+                    urls.append("https://" + url[7:])
+                    urls.append("http://www." + url[7:])
+        self.assertGreater(len(urls), 100)
+        for url in urls:
+            self.assertIs(indexed(url), linear(url), url)
+        for klass, match in extractor.classify(urls):
+            self.assertIs(klass, linear(match.string), match.string)
+            self.assertEqual(match.groups(),
+                             re.match(match.re.pattern, match.string).groups())
+
+    def test_classify(self):
+        urls = [
+            "https://imgur.com/a/abcde",
+            "https://example.org/",
+            "generic:https://example.org/",
+            "https://imgur.com/a/abcde",
+            "http://www.hbrowse.com/10363/c00000",
+        ]
+        result = [(klass.__name__, match.groups())
+                  for klass, match in extractor.classify(urls)]
+        self.assertEqual(result, [
+            ("ImgurAlbumExtractor", ("abcde",)),
+            ("GenericExtractor", ("https://example.org/",)),
+            ("HbrowseChapterExtractor", ("10363", "c00000")),
+        ])
+
+    def test_children(self):
+        queue = [
+            ("https://imgur.com/a/abcde", {"id": 1}),
+            ("https://example.org/", {"id": 2}),
+            ("https://imgur.com/a/fghij", None),
+            ("https://imgur.com/a/abcde", {"id": 1}),
+        ]
+        result = [(url, extr.category, extr.parent_data)
+                  for url, extr in job.children(queue)]
+        self.assertEqual(result, [
+            ("https://imgur.com/a/abcde", "imgur", {"id": 1}),
+            ("https://imgur.com/a/fghij", "imgur", None),
+        ])
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "manifest")
+        config.set(("cache", "manifest"), self.path)
+
+    def tearDown(self):
+        config.clear()
+        self.dir.cleanup()
+
+    def test_content(self):
+        infos = extractor._build_manifest()
+        classes = [extractor._get_class(info) for info in infos]
+        self.assertEqual(set(classes), set(extractor.extractors()))
+        for info, klass in zip(infos, classes):
+            self.assertEqual(info["pattern"], klass.pattern)
+            self.assertEqual(info["category"], klass.category)
+            self.assertEqual(info["subcategory"], klass.subcategory)
+
+    def test_staleness(self):
+        infos = extractor._build_manifest()
+        self.assertEqual(extractor._load_manifest(), infos)
+        with open(self.path) as file:
+            data = json.load(file)
+        data["stamp"][0] = "0.0.0"
+        with open(self.path, "w") as file:
+            json.dump(data, file)
+        self.assertIsNone(extractor._load_manifest())
+        os.unlink(self.path)
+        self.assertIsNone(extractor._load_manifest())
+
+    def test_imports(self):
+        extractor._build_manifest()
+        code = ("import sys; from gallery_dl import extractor, config;"
+                "config.set(('cache', 'manifest'), sys.argv[1]);"
+                "extractor.find('https://imgur.com/a/abcde');"
+                "print(sorted(m for m in sys.modules"
+                "      if m.startswith('gallery_dl.extractor.')))")
+        out = subprocess.check_output([sys.executable, "-c", code, self.path])
+        self.assertEqual(
+            out.decode().strip(),
+            "['gallery_dl.extractor.common', 'gallery_dl.extractor.imgur', "
+            "'gallery_dl.extractor.message']")
+
+
+
+class TestOrderedMap(unittest.TestCase):
+
+    def test_order(self):
+        def func(num):
+            time.sleep(0.01 * (num % 3))
+            return num * 2
+        for workers in (1, 4):
+            self.assertEqual(list(ordered_map(func, range(10), workers)),
+                             list(range(0, 20, 2)))
+
+    def test_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+        def func(num):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return num
+        results = ordered_map(func, itertools.count(), 3)
+        self.assertEqual(list(itertools.islice(results, 12)), list(range(12)))
+        results.close()
+        self.assertEqual(running[1], 3)
+
+    def test_error(self):
+        def func(num):
+            if num == 2:
+                raise ValueError(num)
+            return num
+        results = ordered_map(func, range(5), 4)
+        self.assertEqual(next(results), 0)
+        self.assertEqual(next(results), 1)
+        with self.assertRaises(ValueError):
+            next(results)
+
+
+
+class TestEncoding(unittest.TestCase):
+
+    @staticmethod
+    def response(content, ctype=None):
+        response = requests.Response()
+        response._content = content
+        if ctype:
+            response.headers["Content-Type"] = ctype
+        return response
+
+    def test_order(self):
+        html = b'<html><head><meta charset="shift_jis"></head>'
+        response = self.response(html, "text/html; charset=EUC-JP")
+        self.assertEqual(resolve_encoding(response, "utf-8", "cp1252"),
+                         "utf-8")
+        self.assertEqual(resolve_encoding(response, None, "cp1252"),
+                         "EUC-JP")
+        response = self.response(html, "text/html")
+        self.assertEqual(resolve_encoding(response, None, "cp1252"),
+                         "cp1252")
+        self.assertEqual(resolve_encoding(response), "shift_jis")
+        response = self.response(b"<html>", "text/html")
+        self.assertIsNone(resolve_encoding(response))
+
+    def test_scan(self):
+        for content, ctype, expected in (
+            (b'<meta http-equiv="Content-Type" '
+             b'content="text/html; charset=windows-1251">', None,
+             "windows-1251"),
+            (b"<?xml version='1.0' encoding='ISO-8859-2'?><posts/>",
+             "text/xml", "ISO-8859-2"),
+            (b"\xef\xbb\xbf<html>", "text/html", "utf-8-sig"),
+            (b"[]", "application/json", "utf-8"),
+            (b'<meta charset="unknown-charset">', None, None),
+        ):
+            response = self.response(content, ctype)
+            self.assertEqual(resolve_encoding(response), expected)
+        # an unknown charset in the header is skipped
+        response = self.response(b"", "text/html; charset=x-nonsense")
+        self.assertIsNone(resolve_encoding(response))
+
+
+class FakeBooru(booru.JSONBooruExtractor, booru.BooruTagExtractor):
+    category = "fakebooru"
+
+    def __init__(self, pages):
+        booru.BooruTagExtractor.__init__(self, re.match("(.+)", "tag"))
+        self.params["limit"] = 3
+        self.pages = pages
+        self.requested = []
+
+    def request_page(self, params):
+        self.requested.append(params["page"])
+        time.sleep(0.01)
+        count = 3 if params["page"] < self.pages else 1
+        return [{"page": params["page"], "num": i} for i in range(count)]
+
+
+class TestBooru(unittest.TestCase):
+
+    def tearDown(self):
+        config.clear()
+
+    def test_pages(self):
+        for prefetch in (0, 1, 3):
+            config.set(("extractor", "fakebooru", "prefetch"), prefetch)
+            extr = FakeBooru(4)
+            posts = list(extr.items_impl())
+            self.assertEqual([(p["page"], p["num"]) for p in posts], [
+                (1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (2, 2),
+                (3, 0), (3, 1), (3, 2), (4, 0),
+            ])
+            # pages after the short one are requested at most 'prefetch'
+            # times and never waited for
+            self.assertEqual(sorted(extr.requested)[:4], [1, 2, 3, 4])
+            self.assertLessEqual(len(extr.requested), 4 + prefetch)
+            if not prefetch:
+                self.assertEqual(len(extr.requested), 4)
+
+    def test_no_prefetch(self):
+        # by default, and for single pages, no page is requested in vain
+        for pages in (1, 4):
+            extr = FakeBooru(pages)
+            list(extr.items_impl())
+            self.assertEqual(extr.requested, list(range(1, pages + 1)))
+
+        config.set(("extractor", "fakebooru", "prefetch"), 3)
+        extr = FakeBooru(1)
+        list(extr.items_impl())
+        self.assertEqual(extr.requested, [1])
+
+    def test_json_stream(self):
+        posts = [
+            {"id": i, "tags": "a b \u00e4 \\\"]", "score": -1.5e3,
+             "parent": None, "children": [1, [2, {"x": "}"}]]}
+            for i in range(20)
+        ] + [123456789, "text", True]
+        data = json.dumps(posts, ensure_ascii=False).encode()
+        for chunk_size in (1, 3, 7, 64, 65536):
+            result = booru.iter_json_array(io.BytesIO(data), chunk_size)
+            self.assertEqual(list(result), posts)
+        for data in (b"[]", b" [ ] ", b"", b'{"success": false}'):
+            self.assertEqual(list(booru.iter_json_array(io.BytesIO(data))),
+                             [])
+        with self.assertRaises(ValueError):
+            list(booru.iter_json_array(io.BytesIO(b'[{"id": 1}, {"id"')))
+
+    def test_xml_stream(self):
+        data = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<posts count="3" offset="0">' + "".join(
+                    '<post id="{}" tags="&amp; \u00e4"><tag name="x"/></post>'
+                    .format(i) for i in range(3)) + '</posts>').encode()
+        self.assertEqual(list(booru.iter_xml_items(io.BytesIO(data))), [
+            {"id": str(i), "tags": "& \u00e4"} for i in range(3)
+        ])
+
+
+class TestSankaku(unittest.TestCase):
+
+    def test_archived(self):
+        from gallery_dl import archive
+        from gallery_dl.extractor import sankaku
+        extr = extractor.find("https://chan.sankakucomplex.com/?tags=bonocho")
+        self.assertIsInstance(extr, sankaku.SankakuTagExtractor)
+        self.assertFalse(extr.archived("123"))
+
+        extr.archive = archive.DownloadArchive(":memory:", "sankaku", "{id}")
+        extr.archive.add("sankaku123")
+        self.assertTrue(extr.archived("123"))
+        self.assertFalse(extr.archived("456"))
+
+        # formats with other fields are left to the job
+        for fmt in ("{category}_{id}", "{md5}", "{id:>08d}"):
+            extr.archive = archive.DownloadArchive(":memory:", "sankaku", fmt)
+            self.assertFalse(extr.archived("123"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import time
+import unittest
+import requests
+import gallery_dl.config as config
+import gallery_dl.archive as archive
+import gallery_dl.httpcache as httpcache
+import gallery_dl.database as database
+
+
+class FakeSession():
+    """Serve 'pages' and record the headers of each request"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.requests.append((url, headers))
+        content, etag = self.pages[url]
+        response = requests.Response()
+        response.url = url
+        if headers and headers.get("If-None-Match") == etag:
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response._content = content
+            response.headers["Content-Type"] = "text/html; charset=utf-8"
+            if etag:
+                response.headers["ETag"] = etag
+        return response
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        # each test gets its own in-memory database
+        database._connections.clear()
+
+    def tearDown(self):
+        config.clear()
+
+    def test_revalidate(self):
+        session = FakeSession({"http://example.org/?p=1": (b"page", '"a"')})
+        rcache = httpcache.ResponseCache(":memory:", "test")
+
+        response = rcache.request(session, "http://example.org/",
+                                  params={"p": 1})
+        self.assertEqual(response.content, b"page")
+        response = rcache.request(session, "http://example.org/",
+                                  params={"p": 1})
+        self.assertEqual(response.content, b"page")
+        self.assertEqual(response.text, "page")
+        self.assertTrue(response.from_cache)
+        self.assertEqual(session.requests, [
+            ("http://example.org/?p=1", {}),
+            ("http://example.org/?p=1", {"If-None-Match": '"a"'}),
+        ])
+
+        session.pages["http://example.org/?p=1"] = (b"new", '"b"')
+        response = rcache.request(session, "http://example.org/?p=1")
+        self.assertEqual(response.content, b"new")
+        self.assertEqual(rcache.get("http://example.org/?p=1")[0], '"b"')
+
+    def test_ttl(self):
+        config.set(("extractor", "test", "http-cache-ttl"), 60)
+        session = FakeSession({"http://example.org/": (b"page", None)})
+        rcache = httpcache.ResponseCache(":memory:", "test")
+        for _ in range(3):
+            response = rcache.request(session, "http://example.org/")
+            self.assertEqual(response.content, b"page")
+        self.assertEqual(len(session.requests), 1)
+
+    def test_no_validator(self):
+        session = FakeSession({"http://example.org/": (b"page", None)})
+        rcache = httpcache.ResponseCache(":memory:", "test")
+        rcache.request(session, "http://example.org/")
+        self.assertIsNone(rcache.get("http://example.org/"))
+
+    def test_size_limit(self):
+        config.set(("extractor", "test", "http-cache-size"), 10)
+        session = FakeSession({
+            "http://example.org/" + str(i): (b"12345", str(i))
+            for i in range(3)
+        })
+        rcache = httpcache.ResponseCache(":memory:", "test")
+        for i in range(3):
+            rcache.request(session, "http://example.org/" + str(i))
+            rcache.touch("http://example.org/" + str(i),
+                         int(time.time()) + i, False)
+        self.assertIsNone(rcache.get("http://example.org/0"))
+        self.assertIsNotNone(rcache.get("http://example.org/1"))
+        self.assertIsNotNone(rcache.get("http://example.org/2"))
+
+    def test_content_encoding(self):
+        # cached bodies are stored decoded
+        class GzipSession(FakeSession):
+            def request(self, method, url, headers=None, **kwargs):
+                response = FakeSession.request(self, method, url, headers)
+                response.headers["Content-Encoding"] = "gzip"
+                return response
+
+        config.set(("extractor", "test", "http-cache-ttl"), 60)
+        session = GzipSession({"http://example.org/": (b"page", None)})
+        rcache = httpcache.ResponseCache(":memory:", "test")
+        rcache.request(session, "http://example.org/")
+        response = rcache.request(session, "http://example.org/")
+        self.assertTrue(response.from_cache)
+        self.assertEqual(dict(response.headers),
+                         {"Content-Type": "text/html; charset=utf-8"})
+
+    def test_shared_database(self):
+        rcache = httpcache.ResponseCache(":memory:", "test")
+        arch = archive.DownloadArchive(":memory:", "test", "{id}")
+        self.assertIs(rcache.db, arch.db)
+        tables = rcache.db.execute(
+            "SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        self.assertEqual(sorted(tables), [("archive",), ("responses",)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import os
+import time
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import requests
+from gallery_dl import config, job, exception
+from gallery_dl.extractor.common import Extractor
+from gallery_dl.extractor.message import Message
+from .httpserver import Server
+
+
+class FakeExtractor(Extractor):
+    """Yield 'messages' and raise the exceptions among them"""
+    directory_fmt = ["{category}"]
+    filename_fmt = "{name}"
+
+    def __init__(self, messages, category="fake", delay=0, log=None):
+        self.category = category
+        Extractor.__init__(self)
+        self.messages = messages
+        self.delay = delay
+        self.log = log
+
+    def items(self):
+        if self.log is not None:
+            self.log.begin(self)
+        try:
+            yield Message.Version, 1
+            yield Message.Directory, {"category": self.category}
+            time.sleep(self.delay)
+            for msg in self.messages:
+                if isinstance(msg, Exception):
+                    raise msg
+                yield msg
+        finally:
+            if self.log is not None:
+                self.log.end(self)
+
+
+class RunLog():
+    """Record the order and concurrency of extractor runs"""
+
+    def __init__(self):
+        self.order = []
+        self.active = {}
+        self.max_active = {}
+        self.lock = threading.Lock()
+
+    def begin(self, extr):
+        with self.lock:
+            self.order.append(extr.messages)
+            cat = extr.category
+            self.active[cat] = self.active.get(cat, 0) + 1
+            self.max_active[cat] = max(self.max_active.get(cat, 0),
+                                       self.active[cat])
+
+    def end(self, extr):
+        with self.lock:
+            self.active[extr.category] -= 1
+
+
+class JobTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server()
+        self.dir = tempfile.TemporaryDirectory()
+        config.set(("base-directory",), self.dir.name)
+        config.set(("output", "mode"), "pipe")
+
+    def tearDown(self):
+        config.clear()
+        self.server.close()
+        self.dir.cleanup()
+
+    def url(self, name, content=None, **options):
+        """Serve a file and return a Url message for it"""
+        if content is None:
+            content = name.encode() * 100
+        url = self.server.add("/" + name, content, **options)
+        return Message.Url, url, {"name": name}
+
+    def missing(self, name):
+        """Return a Url message for a file that does not exist"""
+        return Message.Url, self.server.url("/" + name), {"name": name}
+
+    def path(self, name, category="fake"):
+        return os.path.join(self.dir.name, category, name)
+
+    def read(self, name, category="fake"):
+        with open(self.path(name, category), "rb") as file:
+            return file.read()
+
+
+class TestDownloadPool(JobTestCase):
+
+    def setUp(self):
+        JobTestCase.setUp(self)
+        config.set(("downloader", "workers"), 4)
+
+    def test_download(self):
+        names = ["f{}.bin".format(i) for i in range(8)]
+        extr = FakeExtractor([self.url(name, delay=0.05) for name in names])
+        job.DownloadJob(extr).run()
+        for name in names:
+            self.assertEqual(self.read(name), name.encode() * 100)
+        self.assertGreater(self.server.max_active, 1)
+        self.assertLessEqual(self.server.max_active, 4)
+
+    def test_same_path(self):
+        # a second message for the same file while the first one is still
+        # being downloaded must not write to it concurrently
+        first = self.url("a.bin", delay=0.1)
+        second = (Message.Url, self.server.add("/b.bin", b"b"),
+                  {"name": "a.bin"})
+        job.DownloadJob(FakeExtractor([first, second])).run()
+        self.assertEqual([path for path, _ in self.server.requests],
+                         ["/a.bin"])
+        self.assertEqual(self.read("a.bin"), b"a.bin" * 100)
+
+    def test_error(self):
+        messages = [self.url("a.bin", delay=0.05),
+                    self.url("b.bin", status=403)]
+        with self.assertRaises(requests.exceptions.HTTPError):
+            job.DownloadJob(FakeExtractor(messages)).run()
+        self.assertTrue(os.path.exists(self.path("a.bin")))
+        self.assertFalse(os.path.exists(self.path("b.bin")))
+
+    def test_cancel(self):
+        config.set(("downloader", "workers"), 2)
+        messages = [self.url("f{}.bin".format(i), delay=0.2)
+                    for i in range(6)]
+        messages.append(ValueError())
+        with self.assertRaises(ValueError):
+            job.DownloadJob(FakeExtractor(messages)).run()
+        time.sleep(0.5)
+        # only the downloads that had already been started got completed
+        self.assertLessEqual(len(self.server.requests), 2)
+        self.assertFalse(os.path.exists(self.path("f5.bin")))
+
+
+class TestDownloadJob(JobTestCase):
+
+    def test_not_found(self):
+        path = os.path.join(self.dir.name, "archive.sqlite3")
+        config.set(("extractor", "archive"), path)
+        messages = [self.missing("missing.bin"), self.url("a.bin")]
+        djob = job.DownloadJob(FakeExtractor(messages))
+        djob.run()
+        self.assertFalse(os.path.exists(self.path("missing.bin")))
+        self.assertTrue(os.path.exists(self.path("a.bin")))
+        self.assertNotIn("fakemissing.bin", djob.archive)
+        self.assertIn("fakea.bin", djob.archive)
+
+    def test_part_not_found(self):
+        os.makedirs(self.path(""))
+        with open(self.path("f.bin.part"), "wb") as file:
+            file.write(b"partial")
+        job.DownloadJob(FakeExtractor([self.missing("f.bin")])).run()
+        self.assertFalse(os.path.exists(self.path("f.bin")))
+        with open(self.path("f.bin.part"), "rb") as file:
+            self.assertEqual(file.read(), b"partial")
+
+        # no empty '.part' file is left behind
+        job.DownloadJob(FakeExtractor([self.missing("g.bin")])).run()
+        self.assertFalse(os.path.exists(self.path("g.bin.part")))
+
+    def test_part_resume(self):
+        os.makedirs(self.path(""))
+        with open(self.path("f.bin.part"), "wb") as file:
+            file.write(b"f.bin" * 10)
+        job.DownloadJob(FakeExtractor([self.url("f.bin")])).run()
+        self.assertEqual(self.read("f.bin"), b"f.bin" * 100)
+        self.assertFalse(os.path.exists(self.path("f.bin.part")))
+        self.assertEqual(self.server.requests[0][1]["Range"], "bytes=50-")
+
+
+class TestJobScheduler(JobTestCase):
+
+    def run_scheduler(self, extractors, workers):
+        queue = [("fake:" + str(i), None) for i in range(len(extractors))]
+        children = [(url, extr) for (url, _), extr in zip(queue, extractors)]
+        with unittest.mock.patch.object(job, "children",
+                                        lambda q: iter(children)):
+            job.JobScheduler(workers).run(queue)
+
+    def test_order(self):
+        log = RunLog()
+        extractors = [
+            FakeExtractor([self.url("f{}.bin".format(i))], log=log)
+            for i in range(5)
+        ]
+        self.run_scheduler(extractors, 1)
+        self.assertEqual(log.order, [e.messages for e in extractors])
+        for i in range(5):
+            self.assertTrue(os.path.exists(self.path("f{}.bin".format(i))))
+
+    def test_category_limit(self):
+        config.set(("extractor", "a", "job-workers"), 1)
+        log = RunLog()
+        extractors = [
+            FakeExtractor([], category, delay=0.05, log=log)
+            for category in ("a", "b") * 4
+        ]
+        self.run_scheduler(extractors, 4)
+        self.assertEqual(len(log.order), 8)
+        self.assertEqual(log.max_active["a"], 1)
+        self.assertGreater(log.max_active["b"], 1)
+
+    def test_error(self):
+        extractors = [
+            FakeExtractor([self.url("a.bin")]),
+            FakeExtractor([exception.NotFoundError()]),
+            FakeExtractor([self.url("c.bin")]),
+        ]
+        with self.assertRaises(exception.NotFoundError):
+            self.run_scheduler(extractors, 1)
+
+
+class TestAsyncDownloadJob(JobTestCase):
+
+    def run_async(self, urls, report=None):
+        from gallery_dl import asyncjob
+        extractors = {url: FakeExtractor(messages)
+                      for url, messages in urls.items()}
+        with unittest.mock.patch("gallery_dl.extractor.find",
+                                 extractors.get):
+            asyncjob.AsyncDownloadJob(list(urls), report).run()
+
+    def test_download(self):
+        config.set(("async", "jobs"), 4)
+        urls = {
+            "fake:" + str(i): [self.url("f{}-{}.bin".format(i, j), delay=0.05)
+                               for j in range(2)]
+            for i in range(4)
+        }
+        self.run_async(urls)
+        for i in range(4):
+            for j in range(2):
+                name = "f{}-{}.bin".format(i, j)
+                self.assertEqual(self.read(name), name.encode() * 100)
+        self.assertGreater(self.server.max_active, 1)
+
+    def test_report(self):
+        errors = []
+        urls = {
+            "fake:a": [self.url("a.bin")],
+            "fake:b": [exception.NotFoundError()],
+            "fake:c": [self.url("c.bin", status=403)],
+        }
+        self.run_async(urls, lambda url, exc: errors.append((url, exc)))
+        self.assertTrue(os.path.exists(self.path("a.bin")))
+        self.assertEqual(sorted(url for url, _ in errors),
+                         ["fake:b", "fake:c"])
+
+        with self.assertRaises(exception.NotFoundError):
+            self.run_async({"fake:b": [exception.NotFoundError()]})
+
+
+if __name__ == '__main__':
+    unittest.main()
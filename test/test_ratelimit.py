@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import time
+import threading
+import unittest
+import gallery_dl.config as config
+import gallery_dl.ratelimit as ratelimit
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_rate(self):
+        bucket = ratelimit.TokenBucket(50, burst=2)
+        start = time.monotonic()
+        for _ in range(7):
+            bucket.acquire()
+        # 2 requests from the burst, then 5 more at 50 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_threads(self):
+        bucket = ratelimit.TokenBucket(100)
+        times = []
+        def work():
+            for _ in range(5):
+                bucket.acquire()
+                times.append(time.monotonic())
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        times.sort()
+        self.assertGreaterEqual(times[-1] - times[0], 0.18)
+
+
+class TestLimiter(unittest.TestCase):
+
+    def setUp(self):
+        ratelimit._buckets.clear()
+        ratelimit._limiters.clear()
+        ratelimit._defaults.clear()
+
+    def tearDown(self):
+        config.clear()
+
+    def test_config(self):
+        config.set(("extractor", "a", "rate"), 2)
+        config.set(("extractor", "a", "burst"), 3)
+        ratelimit.wait("a", "https://example.org/1")
+        ratelimit.wait("b", "https://example.org/2")
+        bucket = ratelimit._buckets["example.org"]
+        self.assertEqual((bucket.rate, bucket.burst), (2, 3))
+        self.assertIs(ratelimit._limiters["a", "example.org"], bucket)
+        self.assertIsNone(ratelimit._limiters["b", "example.org"])
+
+    def test_shared_host(self):
+        config.set(("extractor", "rate"), 5)
+        ratelimit.wait("a", "https://example.org/1")
+        ratelimit.wait("b", "http://example.org/2")
+        ratelimit.wait("b", "http://www.example.org/")
+        self.assertIs(ratelimit._limiters["a", "example.org"],
+                      ratelimit._limiters["b", "example.org"])
+        self.assertIsNot(ratelimit._limiters["b", "example.org"],
+                         ratelimit._limiters["b", "www.example.org"])
+
+    def test_defaults(self):
+        ratelimit.set_defaults("a", 0.5, 1, 0.01)
+        ratelimit.wait("a", "https://example.org/")
+        bucket = ratelimit._buckets["example.org"]
+        self.assertEqual((bucket.rate, bucket.jitter), (0.5, 0.01))
+        config.set(("extractor", "b", "rate"), 0)
+        ratelimit.set_defaults("b", 0.5)
+        ratelimit.wait("b", "https://example.net/")
+        self.assertNotIn("example.net", ratelimit._buckets)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import time
+import unittest
+import email.utils
+import requests
+import gallery_dl.config as config
+import gallery_dl.retry as retry
+from gallery_dl.extractor.common import safe_request
+
+
+def make_response(code, headers=None):
+    response = requests.Response()
+    response.status_code = code
+    response.reason = "Reason"
+    response.url = "http://example.org/"
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeSession():
+    """Return or raise the items of 'results' in order"""
+
+    category = "test"
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def request(self, method, url, *args, **kwargs):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestRetry(unittest.TestCase):
+
+    def setUp(self):
+        config.set(("extractor", "test", "retry-backoff"), 0.001)
+
+    def tearDown(self):
+        config.clear()
+
+    def test_backoff(self):
+        config.set(("extractor", "test", "retry-backoff"), 1)
+        config.set(("extractor", "test", "retry-backoff-max"), 6)
+        config.set(("extractor", "test", "retry-read"), 10)
+        policy = retry.Retry("test")
+        for limit in (1, 2, 4, 6, 6):
+            delay = policy.read_error()
+            self.assertGreaterEqual(delay, limit / 2)
+            self.assertLessEqual(delay, limit)
+
+    def test_budgets(self):
+        config.set(("extractor", "test", "retry-connect"), 2)
+        config.set(("extractor", "test", "retry-read"), 1)
+        policy = retry.Retry("test")
+        self.assertIsNotNone(policy.connect_error())
+        self.assertIsNotNone(policy.read_error())
+        self.assertIsNotNone(policy.connect_error())
+        self.assertIsNone(policy.read_error())
+        self.assertIsNone(policy.connect_error())
+        self.assertEqual(policy.tries, 5)
+
+    def test_status(self):
+        for code in (400, 401, 403, 404, 410, 501):
+            policy = retry.Retry("test")
+            self.assertIsNone(policy.status_error(make_response(code)))
+        for code in (408, 429, 500, 502):
+            policy = retry.Retry("test")
+            self.assertIsNotNone(policy.status_error(make_response(code)))
+
+    def test_retry_after(self):
+        policy = retry.Retry("test")
+        response = make_response(429, {"Retry-After": "12"})
+        self.assertEqual(policy.status_error(response), 12)
+
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+        response = make_response(503, {"Retry-After": date})
+        self.assertAlmostEqual(policy.status_error(response), 30, delta=2)
+
+        response = make_response(503, {"Retry-After": "3600"})
+        self.assertIsNone(policy.status_error(response))
+
+        # only used for 429 and 503
+        response = make_response(500, {"Retry-After": "12"})
+        self.assertLess(policy.status_error(response), 1)
+
+    def test_safe_request(self):
+        ok = make_response(200)
+        session = FakeSession([
+            requests.exceptions.ConnectionError(),
+            make_response(503, {"Retry-After": "0"}),
+            make_response(500),
+            ok,
+        ])
+        self.assertIs(safe_request(session, "http://example.org/"), ok)
+
+        session = FakeSession([make_response(500), make_response(404)])
+        with self.assertRaises(requests.exceptions.HTTPError):
+            safe_request(session, "http://example.org/")
+        self.assertEqual(session.calls, 2)
+
+        config.set(("extractor", "test", "retry-connect"), 1)
+        session = FakeSession([requests.exceptions.ConnectionError()] * 3)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            safe_request(session, "http://example.org/")
+        self.assertEqual(session.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Mike Fährmann
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 as
+# published by the Free Software Foundation.
+
+import unittest
+import os
+import io
+import tempfile
+import contextlib
+import gallery_dl
+import gallery_dl.config as config
+import gallery_dl.workqueue as workqueue
+
+
+class FakeJob():
+    """Job that fails for URLs starting with 'error' or 'interrupt'"""
+    runs = []
+
+    def __init__(self, url):
+        self.url = url
+
+    def run(self):
+        self.runs.append(self.url)
+        if self.url.startswith("error"):
+            raise ValueError(self.url)
+        if self.url.startswith("interrupt"):
+            raise KeyboardInterrupt()
+
+class TestWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+        fd, self._queuefile = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self._queuefile)
+
+    def test_order(self):
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.add(["a", "b", "c", "a"])
+        result = []
+        for url in queue:
+            result.append(url)
+            queue.done(url)
+        self.assertEqual(result, ["a", "b", "c"])
+        self.assertEqual(queue.count(workqueue.DONE), 3)
+
+    def test_resume(self):
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.add(["a", "b", "c"])
+        urls = iter(queue)
+        queue.done(next(urls))
+        queue.failed(next(urls), "error")
+        next(urls)
+        del urls, queue
+
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.add(["a", "b", "c", "d"])
+        self.assertEqual(list(queue), ["c", "d"])
+        self.assertEqual(queue.count(workqueue.FAILED), 1)
+
+    def test_load(self):
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.load(["a", "b", "c"])
+        queue.done(next(iter(queue)))
+        del queue
+
+        # the same list continues where the last run stopped
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.load(["a", "b", "c"])
+        self.assertEqual(next(iter(queue)), "b")
+        del queue
+
+        # a different list, e.g. from stdin, starts from scratch
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.load(["d", "a"])
+        self.assertEqual(list(queue), ["d", "a"])
+        self.assertEqual(queue.count(workqueue.DONE), 0)
+
+    def test_run_jobs(self):
+        FakeJob.runs = []
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.add(["a", "error-b", "c"])
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            gallery_dl.run_jobs(FakeJob, queue, queue)
+        self.assertEqual(FakeJob.runs, ["a", "error-b", "c"])
+        self.assertIn("error-b", stderr.getvalue())
+
+        # a finished run leaves nothing behind for the next one
+        self.assertEqual(queue.count(workqueue.DONE), 0)
+        self.assertEqual(queue.count(workqueue.FAILED), 0)
+        queue.add(["a", "error-b", "c"])
+        self.assertEqual(len(list(queue)), 3)
+
+    def test_run_jobs_interrupted(self):
+        FakeJob.runs = []
+        queue = workqueue.WorkQueue(self._queuefile)
+        queue.add(["a", "interrupt", "c"])
+        with self.assertRaises(KeyboardInterrupt):
+            gallery_dl.run_jobs(FakeJob, queue, queue)
+        del queue
+
+        queue = workqueue.WorkQueue(self._queuefile)
+        self.assertEqual(queue.count(workqueue.DONE), 1)
+        self.assertEqual(list(queue), ["interrupt", "c"])
+
+    def test_source(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        try:
+            tempfile.tempdir = tmpdir.name
+            queue_a = workqueue.WorkQueue(source="a.txt")
+            queue_a.add(["x"])
+            queue_b = workqueue.WorkQueue(source="b.txt")
+            self.assertEqual(list(queue_b), [])
+            self.assertEqual(list(workqueue.WorkQueue(source="a.txt")),
+                             ["x"])
+        finally:
+            tempfile.tempdir = None
+            config.clear()
+            tmpdir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()